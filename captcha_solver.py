@@ -1,6 +1,8 @@
 """2Captcha integration for solving reCAPTCHA"""
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional, Tuple
 from loguru import logger
 
@@ -9,6 +11,18 @@ class CaptchaSolver:
     
     def __init__(self, api_key: str):
         self.api_key = api_key
+        # Reused for the submit and all result polls (HTTP keep-alive)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                              max_retries=Retry(total=3, backoff_factor=0.5,
+                                                status_forcelist=(500, 502, 503, 504),
+                                                raise_on_status=False))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
     
     def solve_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
         """Solve reCAPTCHA using 2Captcha service"""
@@ -30,7 +44,7 @@ class CaptchaSolver:
             }
             
             logger.info("Submitting reCAPTCHA to 2Captcha...")
-            response = requests.post(submit_url, data=submit_params, timeout=30)
+            response = self.session.post(submit_url, data=submit_params, timeout=30)
             
             if response.status_code != 200:
                 logger.error(f"2Captcha submission failed: HTTP {response.status_code}")
@@ -53,48 +67,65 @@ class CaptchaSolver:
             logger.error(f"Unexpected error in captcha solver: {e}")
             return None
     
-    def _wait_for_solution(self, captcha_id: str, max_attempts: int = 60, 
-                          check_interval: int = 5) -> Optional[str]:
-        """Wait for captcha solution"""
+    def _wait_for_solution(self, captcha_id: str, max_wait_seconds: int = 135,
+                          check_interval: float = 2, initial_delay: int = 15,
+                          max_interval: float = 6, backoff: float = 1.5) -> Optional[str]:
+        """Wait for captcha solution.
+
+        Polls every *check_interval* seconds after *initial_delay*, backing off by *backoff*
+        on each CAPCHA_NOT_READY up to *max_interval*, within a *max_wait_seconds* budget."""
         result_url = "http://2captcha.com/res.php"
         
-        logger.info(f"Waiting for solution (max {max_attempts * check_interval} seconds)...")
+        logger.info(f"Waiting for solution (max {max_wait_seconds} seconds)...")
         
-        for attempt in range(max_attempts):
-            time.sleep(check_interval)
-            
-            result_params = {
-                'key': self.api_key,
-                'action': 'get',
-                'id': captcha_id,
-                'json': 1
-            }
-            
+        # Solves typically take 15-25s; polling earlier only burns requests
+        started = time.monotonic()
+        deadline = started + max_wait_seconds
+        time.sleep(min(initial_delay, max_wait_seconds))
+        
+        result_params = {
+            'key': self.api_key,
+            'action': 'get',
+            'id': captcha_id,
+            'json': 1
+        }
+        interval = check_interval
+        next_progress_log = started + 30
+        
+        while True:
             try:
-                result_response = requests.get(result_url, params=result_params, timeout=10)
-                
-                if result_response.status_code != 200:
-                    continue
+                result_response = self.session.get(result_url, params=result_params, timeout=10)
                 
-                result = result_response.json()
-                
-                if result.get('status') == 1:
-                    solution = result['request']
-                    logger.success(f"reCAPTCHA solved! (length: {len(solution)})")
-                    return solution
-                
-                elif result.get('status') == 0:
-                    request_status = result.get('request', '')
-                    if request_status == 'CAPCHA_NOT_READY':
-                        if attempt % 6 == 0:
-                            logger.info(f"Still waiting... ({attempt * check_interval}s elapsed)")
-                    else:
-                        logger.error(f"2Captcha error: {request_status}")
-                        return None
+                if result_response.status_code == 200:
+                    result = result_response.json()
+                    
+                    if result.get('status') == 1:
+                        solution = result['request']
+                        logger.success(f"reCAPTCHA solved! (length: {len(solution)})")
+                        return solution
+                    
+                    elif result.get('status') == 0:
+                        request_status = result.get('request', '')
+                        if request_status == 'CAPCHA_NOT_READY':
+                            interval = min(max_interval, interval * backoff)
+                            if time.monotonic() >= next_progress_log:
+                                logger.info(f"Still waiting... ({time.monotonic() - started:.0f}s elapsed)")
+                                next_progress_log += 30
+                        else:
+                            logger.error(f"2Captcha error: {request_status}")
+                            return None
+                else:
+                    interval = check_interval
             
             except Exception as e:
                 logger.warning(f"Error checking result: {e}")
-                continue
+                # Transport error, not solver progress: retry at the base cadence
+                interval = check_interval
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
         
         logger.error("Timeout waiting for 2Captcha solution")
         return None
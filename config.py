@@ -74,11 +74,24 @@ class Config:
     # Allow overriding via environment so GitHub Actions can set different modes for normal vs debug retry
     HEADLESS = os.getenv('HEADLESS', 'true').lower() in ['1','true','yes']  # default headless true
     DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() in ['1','true','yes']
+    # Optional persistent Chrome profile; keeps the login session between runs (blank = fresh profile)
+    CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR', '')
+    # Optional host:port of an already running Chrome (--remote-debugging-port) to attach to
+    # instead of cold-launching one per run (blank = launch a new browser)
+    CHROME_DEBUGGER_ADDRESS = os.getenv('CHROME_DEBUGGER_ADDRESS', '')
     
     # Timing Settings
     PAGE_TIMEOUT = 60000  # 60 seconds
     WAIT_BETWEEN_ACTIONS = 3  # Slower for debugging (seconds)
     MAX_RETRIES = 3
+    # Observed element-wait durations, used to shorten waits that precede a fallback
+    WAIT_STATS_FILE = os.getenv('WAIT_STATS_FILE', str(Path.home() / '.cache' / 'mawaqit_uploader' / 'waits.json'))
+    # Id/attribute selectors learned for text-matched elements, tried first on the next run
+    SELECTOR_CACHE_FILE = os.getenv('SELECTOR_CACHE_FILE', str(Path.home() / '.cache' / 'mawaqit_uploader' / 'selectors.json'))
+    # Mawaqit session cookies saved after a successful login and restored on the next run (blank = off)
+    COOKIE_FILE = os.getenv('COOKIE_FILE', str(Path.home() / '.cache' / 'mawaqit_uploader' / 'cookies.json'))
+    # Saved cookies older than this are not restored; the server-side session has likely expired
+    COOKIE_MAX_AGE_HOURS = int(getenv('COOKIE_MAX_AGE_HOURS', '12'))
     
     LOGIN_URL = getenv('LOGIN_URL', 'https://mawaqit.net/en/backoffice/login')
     
@@ -2,11 +2,101 @@
 import imaplib
 import email
 import re
+import select
+import ssl
 import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
 from loguru import logger
 
+# Precompiled patterns reused for every polled message / MIME part
+# Single alternation so each body is scanned once; group 1 = labelled code, group 2 = bare digits.
+# Digit lookarounds keep a 6-digit run inside a longer number (phone, order id) from matching.
+_CODE_RE = re.compile(r'(?:code|verification|OTP|PIN)[:\s]+(\d{6})(?!\d)|(?<!\d)(\d{6})(?!\d)', re.IGNORECASE)
+_HTML_TAG_RE = re.compile(rb'<[^>]+>')
+# Script/style blocks and inline base64 images never contain the code; drop them before tag stripping
+_SCRIPT_STYLE_RE = re.compile(rb'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_DATA_URI_RE = re.compile(rb'data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+')
+# The code sits near the top of the message; bound the text the code regex has to scan
+_MAX_BODY_BYTES = 32 * 1024
+
+# Start of one message in a FETCH response, and its UID item
+_FETCH_START_RE = re.compile(rb'\d+ \(')
+_FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+
+# Mawaqit sender ("noreply@mawaqit.net" is covered by FROM "mawaqit"). Only its mail can carry the
+# code, so the server does the sender check and no other message body is ever downloaded
+_SEARCH_MATCH = 'FROM "mawaqit"'
+
+# Envelope headers plus body text; BODY.PEEK leaves the \Seen flag untouched
+_FETCH_PARTS = "(BODY.PEEK[HEADER.FIELDS (DATE FROM SUBJECT MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)] BODY.PEEK[TEXT])"
+
+
+def find_2fa_code(text: str) -> Optional[str]:
+    """Return the 6-digit code in *text*: a labelled one ("code: 123456") anywhere in the text
+    wins over a bare 6-digit number, even one that appears earlier; None if there is neither."""
+    bare = None
+    for match in _CODE_RE.finditer(text):
+        if match.group(1):
+            return match.group(1)
+        if bare is None:
+            bare = match.group(2)
+    return bare
+
+
+def _imap_has_buffered_data(imap: imaplib.IMAP4) -> bool:
+    """True if a response is already waiting to be read, checked without blocking. imaplib
+    reads through a buffered file, so a line that arrived together with the previous one sits
+    in that buffer where neither select() nor sock.pending() can see it."""
+    timeout = imap.sock.gettimeout()
+    imap.sock.settimeout(0)
+    try:
+        # peek() returns the buffered bytes, or makes one non-blocking read if there are none
+        return bool(imap.file.peek())
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        imap.sock.settimeout(timeout)
+
+
+def imap_idle(imap: imaplib.IMAP4, timeout: float) -> Optional[bool]:
+    """Block in IMAP IDLE until the server announces new mail or *timeout* seconds pass.
+    Returns True on new mail, False on timeout, or None if the server has no IDLE
+    (the caller then falls back to sleep + NOOP polling)."""
+    if "IDLE" not in imap.capabilities:
+        return None
+    tag = imap._new_tag()
+    try:
+        imap.send(tag + b" IDLE\r\n")
+        if not imap.readline().startswith(b"+"):
+            return None
+        got_mail = False
+        end = time.monotonic() + timeout
+        while not got_mail:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            # Gmail pushes EXISTS for mail that landed before IDLE right behind the "+"
+            # continuation, often in the same read; only wait on the socket once nothing is
+            # buffered (waiting there rather than on a socket timeout keeps the reader usable)
+            if not _imap_has_buffered_data(imap) and not select.select([imap.sock], [], [], remaining)[0]:
+                break
+            line = imap.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed during IDLE")
+            got_mail = line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line)
+        imap.send(b"DONE\r\n")
+        # Drain any remaining untagged updates up to the IDLE completion
+        while True:
+            line = imap.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed ending IDLE")
+            if line.startswith(tag):
+                return got_mail
+    finally:
+        imap.tagged_commands.pop(tag, None)
+
+
 class EmailHelper:
     """Helper class for Gmail operations"""
     
@@ -19,115 +109,159 @@ class EmailHelper:
         logger.info("Checking Gmail for 2FA verification code...")
         
         start_time = datetime.now()
+        deadline = time.monotonic() + max_wait_minutes * 60
         check_interval = 10
         attempts = 0
+        imap = None
+        # Built once per wait; the 1-hour window only needs day granularity for SINCE
+        since_date = (start_time - timedelta(hours=1)).strftime("%d-%b-%Y")
+        search_criteria = f'(UNSEEN {_SEARCH_MATCH} SINCE "{since_date}")'
         
-        while (datetime.now() - start_time).total_seconds() < max_wait_minutes * 60:
-            attempts += 1
-            try:
-                logger.debug(f"Email check attempt {attempts}")
-                
-                imap = imaplib.IMAP4_SSL("imap.gmail.com")
-                imap.login(self.gmail_user, self.gmail_app_password)
-                imap.select("inbox")
-                
-                # Search queries
-                search_queries = [
-                    'FROM "mawaqit"',
-                    'FROM "noreply@mawaqit.net"',
-                    'SUBJECT "verification"',
-                    'SUBJECT "code"'
-                ]
-                
-                all_mail_ids = []
-                
-                for query in search_queries:
-                    try:
-                        since_date = (datetime.now() - timedelta(hours=1)).strftime("%d-%b-%Y")
-                        search_criteria = f'({query} SINCE "{since_date}")'
-                        status, messages = imap.search(None, search_criteria)
-                        
-                        if status == 'OK' and messages[0]:
-                            mail_ids = messages[0].split()
-                            all_mail_ids.extend(mail_ids)
-                    except Exception as e:
-                        logger.debug(f"Search error with query {query}: {e}")
-                        continue
-                
-                all_mail_ids = list(set(all_mail_ids))
-                
-                if all_mail_ids:
-                    logger.info(f"Found {len(all_mail_ids)} potential emails")
+        try:
+            while time.monotonic() < deadline:
+                attempts += 1
+                try:
+                    logger.debug("Email check attempt {}", attempts)
+                    
+                    # Keep one authenticated session for the whole wait; after IDLE (or NOOP
+                    # on the polling fallback) new mail is visible without a fresh login/SELECT
+                    if imap is None:
+                        imap = self._connect()
+                    elif "IDLE" not in imap.capabilities:
+                        imap.noop()
                     
-                    for mail_id in reversed(all_mail_ids[-10:]):
-                        try:
-                            status, msg_data = imap.fetch(mail_id, "(RFC822)")
-                            if status != 'OK':
-                                continue
-                            
-                            raw_msg = msg_data[0][1]
-                            msg = email.message_from_bytes(raw_msg)
-                            
-                            from_addr = msg.get('From', '')
-                            if 'mawaqit' not in from_addr.lower():
-                                continue
-                            
-                            body = self._extract_email_body(msg)
-                            
-                            # Look for 6-digit code
-                            code_patterns = [r'(\d{6})']
-                            
-                            for pattern in code_patterns:
-                                matches = re.findall(pattern, body, re.IGNORECASE)
-                                if matches:
-                                    code = matches[0]
-                                    logger.success(f"Found 2FA code: {code}")
-                                    imap.close()
-                                    imap.logout()
-                                    return code
+                    # One SEARCH round-trip, filtered to unread Mawaqit mail on the server
+                    status, messages = imap.uid('SEARCH', None, search_criteria)
+                    all_mail_ids = []
+                    if status == 'OK' and messages[0]:
+                        # Only the newest UIDs are ever inspected; split them off the tail
+                        all_mail_ids = messages[0].rsplit(None, 10)[-10:]
+                    
+                    if all_mail_ids:
+                        logger.info(f"Found {len(all_mail_ids)} potential emails")
                         
-                        except Exception as e:
-                            logger.warning(f"Error processing email: {e}")
-                            continue
-                
-                imap.close()
-                imap.logout()
+                        # One FETCH for the whole UID set instead of a round-trip per message
+                        status, msg_data = imap.uid('FETCH', b','.join(all_mail_ids), _FETCH_PARTS)
+                        if status == 'OK':
+                            for mail_id, raw_msg in self._split_fetch_response(msg_data):
+                                try:
+                                    msg = email.message_from_bytes(raw_msg)
+                                    
+                                    from_addr = msg.get('From', '')
+                                    if 'mawaqit' not in from_addr.lower():
+                                        continue
+                                    
+                                    # Look for 6-digit code, one text part at a time
+                                    for text in self._iter_email_text(msg):
+                                        code = find_2fa_code(text)
+                                        if code:
+                                            logger.success(f"Found 2FA code: {code}")
+                                            imap.uid('STORE', mail_id, '+FLAGS', '(\\Seen)')
+                                            return code
+                                
+                                except Exception as e:
+                                    logger.warning(f"Error processing email: {e}")
+                                    continue
+                    
+                    # Block until Gmail pushes new mail rather than sleeping a fixed interval
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0 and imap_idle(imap, remaining) is None:
+                        logger.info(f"No code found yet, waiting {check_interval} seconds...")
+                        time.sleep(check_interval)
+                    
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    logger.warning(f"IMAP connection dropped, reconnecting: {e}")
+                    self._disconnect(imap)
+                    imap = None
+                    time.sleep(check_interval)
                 
-                logger.info(f"No code found yet, waiting {check_interval} seconds...")
-                time.sleep(check_interval)
-            
-            except Exception as e:
-                logger.error(f"Error checking email: {e}")
-                time.sleep(check_interval)
+                except Exception as e:
+                    logger.error(f"Error checking email: {e}")
+                    time.sleep(check_interval)
+        finally:
+            self._disconnect(imap)
         
         logger.error("No 2FA code found within timeout period")
         return None
     
-    def _extract_email_body(self, msg) -> str:
-        """Extract text body from email message"""
-        body = ""
+    def _connect(self) -> imaplib.IMAP4_SSL:
+        """Open an authenticated IMAP session with the inbox selected"""
+        imap = imaplib.IMAP4_SSL("imap.gmail.com")
+        imap.login(self.gmail_user, self.gmail_app_password)
+        imap.select("inbox")
+        return imap
+    
+    @staticmethod
+    def _disconnect(imap) -> None:
+        """Close and log out, ignoring errors from an already-dead connection"""
+        if imap is None:
+            return
+        try:
+            imap.close()
+            imap.logout()
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _split_fetch_response(msg_data) -> List[Tuple[bytes, bytes]]:
+        """Group a multi-message UID FETCH response into (uid, raw header+text) pairs, newest first"""
+        messages = []
+        current = None
+        for part in msg_data:
+            if isinstance(part, tuple):
+                envelope, payload = part
+                # "<seq> (UID <uid> BODY[...] {n}" opens a message; later literals of the same
+                # message start with " BODY[...]"
+                if _FETCH_START_RE.match(envelope):
+                    current = [None, []]
+                    messages.append(current)
+                if current is None:
+                    continue
+                uid = _FETCH_UID_RE.search(envelope)
+                if uid:
+                    current[0] = uid.group(1)
+                current[1].append(payload)
+            elif isinstance(part, bytes) and current is not None and current[0] is None:
+                # Some servers put "UID <uid>" after the last literal
+                uid = _FETCH_UID_RE.search(part)
+                if uid:
+                    current[0] = uid.group(1)
+        pairs = [(uid, b"".join(chunks)) for uid, chunks in messages if uid]
+        pairs.sort(key=lambda pair: int(pair[0]), reverse=True)
+        return pairs
+    
+    def _iter_email_text(self, msg) -> Iterator[str]:
+        """Yield decoded text parts of an email, every text/plain part before any HTML.
+        HTML parts are only decoded and stripped if the caller keeps iterating, so a code found in
+        the plain-text alternative never pays for the HTML one. Whitespace is left as-is:
+        _CODE_RE already tolerates any run of it after the label."""
+        html_parts = []
+        for part in msg.walk():
+            if part.is_multipart() or part.get_content_disposition() == "attachment":
+                continue
+            content_type = part.get_content_type()
+            if content_type == "text/plain":
+                try:
+                    payload = part.get_payload(decode=True)
+                    if payload:
+                        yield payload[:_MAX_BODY_BYTES].decode('utf-8', errors='ignore')
+                except Exception:
+                    continue
+            elif content_type == "text/html":
+                html_parts.append(part)
         
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                if content_type in ["text/plain", "text/html"]:
-                    try:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            text = payload.decode('utf-8', errors='ignore')
-                            text = re.sub(r'<[^>]+>', ' ', text)
-                            text = ' '.join(text.split())
-                            body += text + " "
-                    except Exception:
-                        continue
-        else:
+        for part in html_parts:
             try:
-                payload = msg.get_payload(decode=True)
+                payload = part.get_payload(decode=True)
                 if payload:
-                    body = payload.decode('utf-8', errors='ignore')
-                    body = re.sub(r'<[^>]+>', ' ', body)
-                    body = ' '.join(body.split())
+                    # Strip on the raw bytes so only one decode pass is needed
+                    yield self._strip_html(payload)[:_MAX_BODY_BYTES].decode('utf-8', errors='ignore')
             except Exception:
-                pass
-        
-        return body
+                continue
+    
+    @staticmethod
+    def _strip_html(payload: bytes) -> bytes:
+        """Remove script/style blocks, inline data URIs and tags from raw HTML bytes"""
+        payload = _SCRIPT_STYLE_RE.sub(b' ', payload)
+        payload = _DATA_URI_RE.sub(b' ', payload)
+        return _HTML_TAG_RE.sub(b' ', payload)
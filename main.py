@@ -2,7 +2,6 @@
 from loguru import logger
 import sys
 from config import Config
-from mawaqit_uploader import MawaqitUploader
 
 
 def setup_logging():
@@ -13,11 +12,14 @@ def setup_logging():
         format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <level>{message}</level>",
         level="DEBUG" if Config.DEBUG_MODE else "INFO"
     )
+    # The DEBUG file sink sees every log call; enqueue hands the formatting and
+    # disk writes to loguru's background thread so the browser flow never blocks on I/O
     logger.add(
         "mawaqit_uploader.log",
         rotation="1 MB",
         retention="7 days",
-        level="DEBUG"
+        level="DEBUG",
+        enqueue=True
     )
 
 
@@ -45,10 +47,14 @@ def main():
     Config.display_config()
     print("-" * 60)
 
+    # Imported only once the environment is valid: the uploader module pulls in
+    # Selenium and requests, which a misconfigured run never needs
+    from mawaqit_uploader import MawaqitUploader
+
     # Create uploader and run
     try:
-        uploader = MawaqitUploader()
-        success = uploader.run()
+        with MawaqitUploader() as uploader:
+            success = uploader.run_with_retries()
 
         if success:
             logger.success("🎉 Prayer times uploaded to Mawaqit!")
@@ -7,64 +7,662 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import urllib.parse
 import re
 import imaplib
+import atexit
 import email
+from email.utils import parsedate_to_datetime
 import json
-from datetime import datetime, timedelta
+import csv
+import io
+import functools
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.keys import Keys
 from config import Config
+from email_helper import find_2fa_code, imap_idle
 from loguru import logger
 import os
 
+# 2FA mail parsing limits; the code itself is picked out by email_helper.find_2fa_code
+_TWO_FA_MAX_BODY_BYTES = 32 * 1024
+# Headers + body text only (no attachments); PEEK keeps the message UNSEEN until we flag it
+_TWO_FA_FETCH_PARTS = "(BODY.PEEK[HEADER.FIELDS (DATE FROM SUBJECT MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)] BODY.PEEK[TEXT])"
+
+# Token injection script; the token is passed as arguments[0], never interpolated into the source
+_INJECT_RECAPTCHA_TOKEN_JS = """
+(function(token){
+    var id = 'g-recaptcha-response';
+    var el = document.getElementById(id);
+    if(!el){
+        el = document.createElement('textarea');
+        el.id = id;
+        el.name = id;
+        el.style = 'display:none;';
+        document.body.appendChild(el);
+    }
+    el.value = token;
+    // also set value on any existing element with that name
+    var els = document.getElementsByName('g-recaptcha-response');
+    for(var i=0;i<els.length;i++){ els[i].value = token; }
+    // Trigger change events
+    var evt = document.createEvent('HTMLEvents');
+    evt.initEvent('change', true, true);
+    el.dispatchEvent(evt);
+})(arguments[0]);
+"""
+
+# Last solved reCAPTCHA token. Solutions stay valid for ~120s but are single-use, so the entry
+# is dropped as soon as a login form is submitted; until then a retry (e.g. after the browser
+# died while waiting for the solver) injects it instead of paying for a new solve.
+_RECAPTCHA_CACHE = {"sitekey": None, "token": None, "ts": 0.0}
+_RECAPTCHA_TOKEN_MAX_AGE = 100
+
+# Authenticated IMAP sessions keyed by (host, user), reused by every 2FA lookup in the process
+# so retries don't pay a TLS handshake + LOGIN each (and don't trip Gmail's connection limits)
+_IMAP_HOST = "imap.gmail.com"
+_IMAP_SESSIONS = {}
+
+
+def _logout_imap_sessions():
+    for mail in _IMAP_SESSIONS.values():
+        try:
+            mail.logout()
+        except Exception:
+            pass
+    _IMAP_SESSIONS.clear()
+
+
+atexit.register(_logout_imap_sessions)
+
+# Displayed accordion labels per English month name, English first, then the French
+# variants the site may use. Extend if you see other variants/languages on the site.
+_MONTH_LABELS = {
+    "January":   ("January", "Janvier"),
+    "February":  ("February", "Février", "Fevrier"),
+    "March":     ("March", "Mars"),
+    "April":     ("April", "Avril"),
+    "May":       ("May", "Mai"),
+    "June":      ("June", "Juin"),
+    "July":      ("July", "Juillet"),
+    "August":    ("August", "Août", "Aout"),
+    "September": ("September", "Septembre"),
+    "October":   ("October", "Octobre"),
+    "November":  ("November", "Novembre"),
+    "December":  ("December", "Décembre", "Decembre"),
+}
+
+
+def _month_label_xpath(label):
+    """Case-insensitive 'element text contains label' XPath."""
+    return ("//*[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
+            f"'abcdefghijklmnopqrstuvwxyz'), '{label.lower()}')]")
+
+
+# (label, xpath) pairs per month, built once at import instead of on every accordion search
+_MONTH_LABEL_XPATHS = {
+    month: tuple((label, _month_label_xpath(label)) for label in labels)
+    for month, labels in _MONTH_LABELS.items()
+}
+
+# Lower-cased label -> 0-based month index (as observed on the site: November -> 10)
+_MONTH_INDEX = {
+    label.lower(): idx
+    for idx, labels in enumerate(_MONTH_LABELS.values())
+    for label in labels
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _iqama_input_selectors(month_index, day, slot):
+    """CSS selectors for one iqama calendar cell, tolerating off-by-one month/slot indexing.
+    Each cell is looked up on every scroll attempt, so the variants are built once per cell."""
+    month_indexes = (month_index, month_index + 1)
+    slots = (slot, slot - 1) if slot > 0 else (slot,)
+    return tuple(f"input[name='configuration[iqamaCalendar][{m}][{day}][{s}]']"
+                 for m in month_indexes for s in slots)
+
+
+# "H:m" / "HH.mm" cell values (spaces already removed); anything else is passed through as-is
+_CSV_TIME_RE = re.compile(r'(\d+)[.:](\d+)')
+
+
+@functools.lru_cache(maxsize=512)
+def _normalize_time(val):
+    """Normalize an iqama CSV time to HH:mm. The same few values repeat across a month's cells,
+    so each distinct string is parsed once."""
+    v = (val or '').strip()
+    if not v:
+        return v
+    match = _CSV_TIME_RE.fullmatch(v.replace(' ', ''))
+    if match:
+        h_i, m_i = int(match.group(1)), int(match.group(2))
+        if 0 <= h_i <= 23 and 0 <= m_i <= 59:
+            return f"{h_i:02d}:{m_i:02d}"
+    return v
+
+
+# reCAPTCHA presence + sitekey in one round-trip. Returns {iframe, container, sitekey}; the sitekey
+# comes from the loaded client config, then data-sitekey, then the widget iframe's k= parameter.
+_PROBE_RECAPTCHA_JS = """
+var iframeCss = arguments[0], containerCss = arguments[1];
+var iframe = document.querySelector(iframeCss);
+var container = document.querySelector(containerCss);
+function fromClientConfig() {
+    var clients = window.___grecaptcha_cfg && window.___grecaptcha_cfg.clients;
+    if (!clients) return null;
+    for (var c in clients) {
+        var client = clients[c];
+        for (var a in client) {
+            var outer = client[a];
+            if (!outer || typeof outer !== 'object') continue;
+            for (var b in outer) {
+                var inner = outer[b];
+                if (inner && typeof inner === 'object' && typeof inner.sitekey === 'string') {
+                    return inner.sitekey;
+                }
+            }
+        }
+    }
+    return null;
+}
+var sitekey = null;
+try { sitekey = fromClientConfig(); } catch (e) {}
+if (!sitekey) {
+    var keyed = document.querySelector('[data-sitekey]');
+    if (keyed) sitekey = keyed.getAttribute('data-sitekey') || null;
+}
+if (!sitekey) {
+    var frames = document.querySelectorAll("iframe[src*='recaptcha' i]");
+    for (var i = 0; i < frames.length && !sitekey; i++) {
+        try { sitekey = new URL(frames[i].src).searchParams.get('k'); } catch (e) {}
+    }
+}
+return {iframe: iframe, container: !!container, sitekey: sitekey};
+"""
+
+# First element matching each group of CSS selectors (tried in order), or null per group
+_FIRST_MATCH_PER_GROUP_JS = """
+var groups = arguments[0], out = [];
+for (var i = 0; i < groups.length; i++) {
+    var hit = null;
+    for (var j = 0; j < groups[i].length && !hit; j++) {
+        try { hit = document.querySelector(groups[i][j]); } catch (e) {}
+    }
+    out.push(hit);
+}
+return out;
+"""
+
+# Open a Bootstrap accordion from any element inside its toggle. Arguments: element, max ancestor
+# depth, force. Without force the toggle is scrolled into view and clicked only if its panel is
+# closed (a second click would collapse it again); with force a panel that is still closed is
+# opened by setting the classes Bootstrap would, and the panel's calendar inputs are counted.
+_OPEN_ACCORDION_JS = """
+var el = arguments[0], maxDepth = arguments[1], force = arguments[2];
+var toggleEl = el, target = null;
+for (var i = 0; i < maxDepth && toggleEl; i++) {
+    target = toggleEl.getAttribute('data-bs-target') || toggleEl.getAttribute('data-target') || toggleEl.getAttribute('href');
+    if (target) break;
+    toggleEl = toggleEl.parentElement;
+}
+if (!target) toggleEl = el;
+var panel = null;
+if (target) {
+    // getElementById copes with ids that start with a digit
+    try {
+        panel = target.charAt(0) === '#' ? document.getElementById(target.substring(1)) : document.querySelector(target);
+    } catch (e) {}
+}
+var wasVisible = !!panel && panel.classList.contains('show');
+if (!force) {
+    toggleEl.scrollIntoView({block: 'center'});
+    if (!wasVisible) toggleEl.click();
+    return {target: target, wasVisible: wasVisible, ariaExpanded: toggleEl.getAttribute('aria-expanded'),
+            clicked: !wasVisible};
+}
+if (!panel) return {success: false, error: 'No target panel found', target: target};
+if (!wasVisible) {
+    panel.classList.add('show', 'in');
+    panel.style.display = 'block';
+    toggleEl.setAttribute('aria-expanded', 'true');
+    toggleEl.classList.remove('collapsed');
+}
+return {success: true, wasVisible: wasVisible, nowVisible: panel.classList.contains('show'),
+        panelInputs: panel.querySelectorAll('input.calendar-prayer-time').length, target: target};
+"""
+
 class MawaqitUploader:
     def __init__(self):
+        # One keep-alive session for 2Captcha (submit + every poll) and the GitHub CSV downloads.
+        # Idempotent requests are retried on transient 5xx; POSTs are never replayed.
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4,
+                              max_retries=Retry(total=3, backoff_factor=0.5,
+                                                status_forcelist=(500, 502, 503, 504),
+                                                raise_on_status=False))
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        # reCAPTCHA sitekeys seen so far, keyed by page netloc + path
+        self._sitekey_cache = {}
+        self._month_name = None
+        # Parsed prayer CSVs, keyed by (path, mtime) so a re-downloaded file is read again
+        self._csv_cache = {}
+        # Per-step wait durations from earlier runs (see _adaptive_timeout)
+        self._wait_stats = self._load_wait_stats()
+        self._selector_cache = self._load_selector_cache()
+        # Debug artifacts are written, and the month's CSVs downloaded, off the main flow
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+        # Month name -> future of its CSV download (see _prefetch_month_csvs)
+        self._csv_prefetch = {}
+        # True while used as a context manager: run() then leaves the browser open
+        self._managed = False
+        # A HEAD request is far cheaper than a Chrome launch that could only time out
+        if not self._site_reachable(Config.LOGIN_URL):
+            self.close()
+            raise RuntimeError(f"{Config.LOGIN_URL} is not reachable; not launching the browser")
         self.setup_browser()
+
+    def _site_reachable(self, url, timeout=10):
+        """Return False only if *url* cannot be connected to.
+        Any HTTP status counts as reachable: Cloudflare often answers a plain HEAD with a
+        403/503 challenge that a real browser gets through, so those only log a warning."""
+        try:
+            r = self._http.head(url, timeout=timeout, allow_redirects=True)
+        except requests.ConnectionError as e:
+            logger.error(f"Pre-flight request to {url} failed: {e}")
+            return False
+        except requests.RequestException as e:
+            logger.warning(f"Pre-flight request to {url} failed: {e}; launching the browser anyway")
+            return True
+        if r.status_code >= 500:
+            logger.warning(f"Pre-flight request to {url} returned HTTP {r.status_code}; launching the browser anyway")
+        return True
         
     def setup_browser(self):
         """Initialize browser with appropriate options"""
         chrome_options = Options()
-        if Config.HEADLESS:
-            chrome_options.add_argument('--headless=new' if hasattr(Options, "add_argument") else '--headless')
-        chrome_options.add_argument('--start-maximized')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
+        if Config.CHROME_DEBUGGER_ADDRESS:
+            # Attach to a pre-warmed Chrome instead of paying a cold launch every run; its
+            # command-line flags and profile were fixed when it was started
+            logger.info(f"Attaching to running Chrome at {Config.CHROME_DEBUGGER_ADDRESS}")
+            chrome_options.debugger_address = Config.CHROME_DEBUGGER_ADDRESS
+        else:
+            if Config.HEADLESS:
+                chrome_options.add_argument('--headless=new' if hasattr(Options, "add_argument") else '--headless')
+            chrome_options.add_argument('--start-maximized')
+            chrome_options.add_argument('--no-sandbox')
+            chrome_options.add_argument('--disable-dev-shm-usage')
+            if Config.CHROME_PROFILE_DIR:
+                # Reuse cookies from the previous run so a still-valid session skips login/2FA
+                os.makedirs(Config.CHROME_PROFILE_DIR, exist_ok=True)
+                chrome_options.add_argument(f'--user-data-dir={os.path.abspath(Config.CHROME_PROFILE_DIR)}')
+        # Return from navigations at DOMContentLoaded; every step after a navigation
+        # already waits for the element it needs, so trackers/widgets can't stall it
+        chrome_options.page_load_strategy = 'eager'
         
         # Enable performance logging to capture network traffic
         chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL', 'browser': 'ALL'})
         
         # Use Selenium Manager (built-in to Selenium 4.6+) to automatically manage ChromeDriver
         self.driver = webdriver.Chrome(options=chrome_options)
+        self.driver.set_page_load_timeout(Config.PAGE_TIMEOUT / 1000)
+
+        # Drop analytics/ad beacons, web fonts and media at the network layer; none of them
+        # are needed to drive the backoffice and they pad every navigation
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(self._BLOCKED_URL_PATTERNS)})
+        except Exception as e:
+            logger.debug(f"Could not install request blocklist: {e}")
+
+    def __enter__(self):
+        """Keep one browser (and its logged-in session) open across several ``run()`` calls."""
+        self._managed = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._managed = False
+        logger.info("Closing browser...")
+        self.close()
+        return False
+
+    def close(self):
+        """Quit the browser and release pooled HTTP connections. Safe to call more than once."""
+        driver, self.driver = getattr(self, "driver", None), None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        try:
+            self._http.close()
+        except Exception:
+            pass
+        # Let queued screenshot writes finish so the files exist for artifact upload
+        self._io_pool.shutdown(wait=True)
+        self._save_wait_stats()
+        self._save_selector_cache()
 
     # Maximum number of ancestor levels to traverse when searching for an accordion toggle
     _ACCORDION_ANCESTOR_DEPTH = 6
 
-    def _find_element_with_selectors(self, selectors, timeout=15):
-        """Try multiple selector tuples until one matches."""
+    _SCREENSHOT_JPEG_QUALITY = 60
+
+    # Network.setBlockedURLs patterns. reCAPTCHA is served from google.com/gstatic.com,
+    # so only the font host is blocked there, never the whole domain. Raster images are
+    # matched by extension (with or without a query string); reCAPTCHA's challenge tiles have
+    # none and still load. Stylesheets stay: visibility checks and accordions depend on them.
+    _BLOCKED_URL_PATTERNS = (
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*hotjar.com*",
+        "*connect.facebook.net*",
+        "*fonts.googleapis.com*",
+        "*fonts.gstatic.com*",
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*.mp4", "*.webm", "*.mp3",
+        "*.png", "*.png?*", "*.jpg", "*.jpg?*", "*.jpeg", "*.jpeg?*",
+        "*.gif", "*.gif?*", "*.webp", "*.webp?*",
+    )
+
+    # reCAPTCHA widget iframe (matched case-insensitively on src or title) and its host container
+    _RECAPTCHA_IFRAME_CSS = "iframe[src*='recaptcha' i], iframe[title*='recaptcha' i]"
+    _RECAPTCHA_CONTAINER_CSS = ".g-recaptcha, #g-recaptcha, [data-sitekey]"
+
+    # Locators for each step of the flow, built once instead of on every call.
+    # (By, selector) pairs go to _find_element_with_selectors; bare XPath tuples
+    # are tried in order and the first visible match wins.
+    _LOGIN_EMAIL_SELECTORS = (
+        (By.CSS_SELECTOR, "input[name='email'], input[type='email'], #email, input[name='username']"),
+    )
+    _LOGIN_PASSWORD_SELECTORS = (
+        (By.CSS_SELECTOR, "input[name='password'], input[type='password'], #password"),
+    )
+    _LOGIN_SUBMIT_SELECTORS = (
+        (By.CSS_SELECTOR, "button[type='submit']"),
+        (By.XPATH, "//button[contains(., 'Login') or contains(., 'Sign in') or contains(., 'Log in')]"),
+    )
+    # reCAPTCHA checkbox inside its iframe (the anchor precedes its border in document order)
+    _RECAPTCHA_CHECKBOX_SELECTORS = (
+        (By.CSS_SELECTOR, "#recaptcha-anchor, .recaptcha-checkbox-border, .recaptcha-checkbox, div[class*='recaptcha-checkbox']"),
+    )
+    # 2FA page: the code field is the only input on the page
+    _TWO_FA_INPUT_SELECTORS = (
+        (By.CSS_SELECTOR, "input[type='text']"),
+        (By.XPATH, "//h1[contains(text(),'Two-factor authentication')]/..//input"
+                   " | //div[contains(text(),'6-digit code')]/following::input[1]"),
+    )
+    # Attribute/class selectors lead each list: they resolve natively in the browser,
+    # while text matching has to compute normalize-space()/translate() on every node
+    _ADMIN_SELECTORS = (
+        (By.CSS_SELECTOR, "a[href*='/admin']"),
+        (By.LINK_TEXT, "ADMIN"),
+        (By.LINK_TEXT, "Admin"),
+        (By.XPATH, "//a[contains(translate(normalize-space(.),'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'),'ADMIN')]"),
+    )
+    _MOSQUE_LINK_XPATHS = (
+        "//a[contains(@href, '/backoffice')]",
+        "//a[contains(@href, '/mosque/')]",
+        "//div[contains(@class, 'card')]//a[contains(@class, 'btn')]",
+        "//a[contains(., 'Backoffice') or contains(., 'Administration')]",
+        "//a[contains(., 'Manage') or contains(., 'Configure') or contains(., 'Admin')]",
+    )
+    # Element groups searched (in this order) for a visible "login" control after 2FA entry
+    _LOGIN_CONTROL_GROUPS = ("button", "a", "input[type='submit'], input[type='button']", "[role='button']")
+    # Enabled 'Actions' controls: exact label, then partial, then any card button mentioning it
+    _ACTIONS_BUTTON_XPATHS = (
+        "(//button[normalize-space(.)='Actions'] | //a[normalize-space(.)='Actions'])[not(@disabled)]",
+        "(//button[contains(normalize-space(.),'Action')] | //a[contains(normalize-space(.),'Action')])[not(@disabled)]",
+        "//div[contains(@class,'card')]//button[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'action')][not(@disabled)]",
+    )
+    _CONFIGURE_LINK_CSS = "a[href*='/mosque/'][href*='/configure']"
+    _CONFIGURE_MENU_SELECTORS = (
+        (By.CSS_SELECTOR, ".dropdown-menu a[href*='/configure'], a.dropdown-item[href*='/configure']"),
+        (By.XPATH, "//a[normalize-space(.)='Configure']"),
+        (By.XPATH, "//button[normalize-space(.)='Configure']"),
+        (By.XPATH, "//li//a[normalize-space(.)='Configure']"),
+        (By.XPATH, "//div[contains(@class,'dropdown-menu')]//a[contains(normalize-space(.),'Configure')]"),
+        (By.XPATH, "//div[contains(@class,'dropdown-menu')]//button[contains(normalize-space(.),'Configure')]"),
+        (By.XPATH, "//*[contains(normalize-space(.),'Configure') and (self::a or self::button or ancestor::li)]"),
+    )
+    # Last resort for the menu item: anything enabled that says 'configure' (short text only,
+    # so the page containers that also contain the word are skipped)
+    _CONFIGURE_FALLBACK_XPATHS = ("//*[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'configure')][not(@disabled)]",)
+    _CONFIGURE_FALLBACK_MAX_TEXT = 40
+    _CALC_SECTION_XPATHS = (
+        "//*[normalize-space(.)='Calculation of prayer times']",
+        "//*[contains(@class, 'panel-heading') and contains(., 'Calculation of prayer times')]",
+        "//*[contains(normalize-space(.), 'Calculation of prayer times')]",
+    )
+    _IQAMA_SECTION_XPATHS = (
+        "//*[contains(text(), 'Iqama') or contains(text(), 'iqama')]",
+        "//div[contains(., 'Iqama')]",
+        "//h3[contains(., 'Iqama')]",
+        "//h4[contains(., 'Iqama')]",
+        "//*[contains(@class, 'panel') and contains(., 'Iqama')]",
+        "//*[contains(@class, 'accordion') and contains(., 'Iqama')]",
+    )
+    _CALENDAR_TAB_XPATHS = (
+        "//a[normalize-space(.)='By calendar']",
+        "//button[normalize-space(.)='By calendar']",
+        "//*[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'calendar')]",
+        "//*[contains(@class, 'nav-link') and contains(., 'calendar')]",
+    )
+    _SAVE_BUTTON_XPATHS = (
+        "//button[normalize-space(.)='Save']",
+        "//*[contains(@class, 'btn-primary') and contains(., 'Save')]",
+    )
+    _SAVE_SUCCESS_CSS = ".alert-success, .toast.show, .flash-success"
+
+    # Prayer columns as they appear in the CSV headers (already title-cased)
+    _ATHAN_PRAYERS = ('Fajr', 'Sunrise', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+    _ATHAN_PRAYERS_NO_SUNRISE = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+    # Columns both CSVs must have (Sunrise is optional, athan only)
+    _REQUIRED_CSV_COLUMNS = _ATHAN_PRAYERS_NO_SUNRISE
+
+    # Iqama calendar slot per prayer: strictly 5 prayers (no Sunrise)
+    # 1: Fajr, 2: Dhuhr, 3: Asr, 4: Maghrib, 5: Isha
+    _IQAMA_PRAYER_SLOTS = (('Fajr', 1), ('Dhuhr', 2), ('Asr', 3), ('Maghrib', 4), ('Isha', 5))
+
+    def _find_element_with_selectors(self, selectors, timeout=15, condition=EC.presence_of_element_located,
+                                     stats_key=None):
+        """Poll all selector tuples in a single wait and return the first one that matches.
+
+        Earlier selectors win when several match on the same poll, but a fallback no
+        longer has to sit out the full timeout of every selector ahead of it.
+        With *stats_key*, the timeout adapts to how long this step took on previous runs.
+        """
+        if stats_key:
+            timeout = self._adaptive_timeout(stats_key, timeout)
+        started = time.monotonic()
         wait = WebDriverWait(self.driver, timeout)
-        last_exc = None
-        for by, selector in selectors:
-            try:
-                return wait.until(EC.presence_of_element_located((by, selector)))
-            except Exception as e:
-                last_exc = e
-        raise last_exc if last_exc else Exception("Element not found with provided selectors")
+        el = wait.until(EC.any_of(*(condition(locator) for locator in selectors)))
+        if stats_key:
+            self._record_wait(stats_key, time.monotonic() - started)
+        return el
+
+    # Adaptive waits: only trust the history once there are enough samples, and
+    # never go below the floor or above what the caller asked for
+    _WAIT_STATS_MIN_SAMPLES = 5
+    _WAIT_STATS_MAX_SAMPLES = 50
+    _WAIT_STATS_FLOOR = 3.0
+
+    def _load_wait_stats(self):
+        try:
+            with open(Config.WAIT_STATS_FILE, "r") as f:
+                stats = json.load(f)
+            return stats if isinstance(stats, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_wait_stats(self):
+        if not self._wait_stats:
+            return
+        try:
+            os.makedirs(os.path.dirname(Config.WAIT_STATS_FILE), exist_ok=True)
+            with open(Config.WAIT_STATS_FILE, "w") as f:
+                json.dump(self._wait_stats, f)
+        except Exception as e:
+            logger.debug(f"Could not persist wait stats: {e}")
+
+    def _record_wait(self, key, seconds):
+        samples = self._wait_stats.setdefault(key, [])
+        samples.append(round(seconds, 3))
+        del samples[:-self._WAIT_STATS_MAX_SAMPLES]
+
+    def _adaptive_timeout(self, key, timeout):
+        """Return p99 * 1.5 of the recorded waits for *key*, clamped to [floor, timeout]."""
+        samples = self._wait_stats.get(key) or []
+        if len(samples) < self._WAIT_STATS_MIN_SAMPLES:
+            return timeout
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return min(timeout, max(self._WAIT_STATS_FLOOR, p99 * 1.5))
+
+    def _filter_visible(self, elements):
+        """Return the displayed subset of *elements* using one script call
+        instead of an ``is_displayed()`` round-trip per element."""
+        if not elements:
+            return []
+        return self.driver.execute_script(
+            """
+            return arguments[0].filter(function (el) {
+                if (!el.isConnected) return false;
+                var style = window.getComputedStyle(el);
+                if (style.display === 'none' || style.visibility === 'hidden') return false;
+                return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+            });
+            """,
+            list(elements),
+        ) or []
+
+    def _load_selector_cache(self):
+        try:
+            with open(Config.SELECTOR_CACHE_FILE, "r") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_selector_cache(self):
+        if not self._selector_cache:
+            return
+        try:
+            os.makedirs(os.path.dirname(Config.SELECTOR_CACHE_FILE), exist_ok=True)
+            with open(Config.SELECTOR_CACHE_FILE, "w") as f:
+                json.dump(self._selector_cache, f, indent=2)
+        except Exception as e:
+            logger.debug(f"Could not persist selector cache: {e}")
+
+    def _first_visible_by_xpath(self, xpaths, max_text_len=None, cache_key=None):
+        """Evaluate *xpaths* in order inside the page and return ``(element, selector)`` for the
+        first displayed match, or ``(None, None)``.  One script call replaces a
+        ``find_elements`` + ``is_displayed()`` round-trip per candidate.
+        With *max_text_len*, matches whose trimmed text is empty or not shorter are skipped.
+
+        With *cache_key*, a unique id/attribute CSS selector for the match is remembered across
+        runs and tried before the (text-walking) XPaths next time; a stale entry just falls
+        through to the XPaths and is replaced.
+        """
+        cached = self._selector_cache.get(cache_key) if cache_key else None
+        try:
+            found = self.driver.execute_script(
+                """
+                var xpaths = arguments[0], maxLen = arguments[1], cached = arguments[2], remember = arguments[3];
+                function visible(el) {
+                    var style = window.getComputedStyle(el);
+                    if (style.display === 'none' || style.visibility === 'hidden') return false;
+                    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+                }
+                function textOk(el) {
+                    if (maxLen === null) return true;
+                    var txt = (el.innerText || '').trim();
+                    return !!txt && txt.length < maxLen;
+                }
+                function stableSelector(el) {
+                    var sel = null;
+                    if (el.id) {
+                        sel = '#' + CSS.escape(el.id);
+                    } else {
+                        var attrs = ['data-bs-target', 'data-target', 'href'];
+                        for (var k = 0; k < attrs.length && !sel; k++) {
+                            var v = el.getAttribute(attrs[k]);
+                            if (v && v !== '#') {
+                                sel = el.tagName.toLowerCase() + '[' + attrs[k] + '="' + CSS.escape(v) + '"]';
+                            }
+                        }
+                    }
+                    return sel && document.querySelectorAll(sel).length === 1 ? sel : null;
+                }
+                if (cached) {
+                    try {
+                        var hit = document.querySelector(cached);
+                        if (hit && visible(hit) && textOk(hit)) return [hit, -1, cached];
+                    } catch (e) {}
+                }
+                for (var i = 0; i < xpaths.length; i++) {
+                    var snap;
+                    try {
+                        snap = document.evaluate(xpaths[i], document, null,
+                                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                    } catch (e) { continue; }
+                    for (var j = 0; j < snap.snapshotLength; j++) {
+                        var el = snap.snapshotItem(j);
+                        if (el.nodeType !== 1 || !visible(el) || !textOk(el)) continue;
+                        return [el, i, remember ? stableSelector(el) : null];
+                    }
+                }
+                return null;
+                """,
+                list(xpaths),
+                max_text_len,
+                cached,
+                bool(cache_key),
+            )
+        except Exception as e:
+            logger.debug(f"In-page XPath lookup failed: {e}")
+            return None, None
+        if not found:
+            return None, None
+        element, index, stable = found
+        if index < 0:
+            return element, cached
+        if cache_key:
+            if stable:
+                self._selector_cache[cache_key] = stable
+            else:
+                self._selector_cache.pop(cache_key, None)
+        return element, xpaths[index]
+
+    def _scroll_and_click(self, element):
+        """Scroll *element* to the viewport centre and click it in a single script call
+        (no separate scroll round-trip, no settle sleep in between). This is a JS click: only for
+        controls that were already clicked from script, not where a trusted click comes first."""
+        self.driver.execute_script(
+            "arguments[0].scrollIntoView({block:'center'}); arguments[0].click();", element)
 
     def _resolve_accordion_toggle(self, element):
         """Traverse up from *element* to find the nearest ancestor (or self) that carries
         a Bootstrap accordion ``data-bs-target`` (Bootstrap 5), ``data-target`` (Bootstrap 3/4),
-        or ``href`` attribute.  Returns the ancestor element if found, or *None* if the maximum
-        depth is reached without a match.
+        or ``href`` attribute.  Returns ``(ancestor, target)`` if found, or ``(None, None)`` if
+        the maximum depth is reached without a match; callers keep the target instead of
+        reading the attributes back one round-trip at a time.
         """
-        toggle = self.driver.execute_script(
+        found = self.driver.execute_script(
             """
             var el = arguments[0];
             var depth = arguments[1];
             for (var i = 0; i < depth && el; i++) {
                 var target = el.getAttribute('data-bs-target') || el.getAttribute('data-target') || el.getAttribute('href');
-                if (target) return el;
+                if (target) return [el, target];
                 el = el.parentElement;
             }
             return null;
@@ -72,27 +670,24 @@ class MawaqitUploader:
             element,
             self._ACCORDION_ANCESTOR_DEPTH,
         )
-        return toggle
+        return tuple(found) if found else (None, None)
 
     def _type_visible(self, element, text, char_delay=0.1):
-        """Type text visibly with logging."""
+        """Type text visibly, one character at a time (logs the field, never the characters)."""
         element.clear()
-        logger.debug(f"Typing into {element.get_attribute('name') or element.get_attribute('id') or 'element'}: ", end='')
+        logger.opt(lazy=True).debug("Typing {} chars into {}", lambda: len(text),
+                                    lambda: element.get_attribute('name') or element.get_attribute('id') or 'element')
         for char in text:
             element.send_keys(char)
-            logger.debug(char, end='', flush=True)
             time.sleep(char_delay)
-        logger.debug("")  # New line after typing
         
     def _detect_recaptcha_iframe(self):
         """Return the iframe element for reCAPTCHA if present, else None."""
         try:
-            iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-            for iframe in iframes:
-                title = (iframe.get_attribute("title") or "").lower()
-                src = (iframe.get_attribute("src") or "").lower()
-                if "recaptcha" in title or "recaptcha" in src:
-                    return iframe
+            # One query instead of reading title/src off every iframe on the page
+            iframes = self.driver.find_elements(By.CSS_SELECTOR, self._RECAPTCHA_IFRAME_CSS)
+            if iframes:
+                return iframes[0]
         except Exception:
             pass
         return None
@@ -101,24 +696,12 @@ class MawaqitUploader:
         """Switch into reCAPTCHA iframe and click the visible checkbox to trigger the challenge/solver."""
         try:
             self.driver.switch_to.frame(iframe_element)
-            wait = WebDriverWait(self.driver, timeout)
-
-            # Try common checkbox selectors in order
-            checkbox_selectors = [
-                (By.ID, "recaptcha-anchor"),
-                (By.CSS_SELECTOR, ".recaptcha-checkbox-border"),
-                (By.CSS_SELECTOR, ".recaptcha-checkbox"),
-                (By.XPATH, "//div[contains(@class,'recaptcha-checkbox')]"),
-            ]
 
-            el = None
-            for by, sel in checkbox_selectors:
-                try:
-                    el = wait.until(EC.element_to_be_clickable((by, sel)))
-                    if el:
-                        break
-                except Exception:
-                    el = None
+            try:
+                el = self._find_element_with_selectors(self._RECAPTCHA_CHECKBOX_SELECTORS, timeout=timeout,
+                                                       condition=EC.element_to_be_clickable)
+            except Exception:
+                el = None
             if not el:
                 logger.error("Could not find clickable reCAPTCHA checkbox inside iframe.")
                 return False
@@ -137,9 +720,8 @@ class MawaqitUploader:
                     logger.error(f"Failed to click reCAPTCHA checkbox: {e}")
                     return False
 
-            # Wait a short moment for challenge to appear / token to be requested
-            time.sleep(1.5)
-            # Return to default content after clicking
+            # Return to default content after clicking; nothing reads the challenge state,
+            # and the 2Captcha round-trip that follows takes far longer than it needs to settle
             self.driver.switch_to.default_content()
             return True
 
@@ -152,33 +734,36 @@ class MawaqitUploader:
             return False
 
     def _extract_sitekey(self):
-        """Try to find a reCAPTCHA sitekey on the page."""
-        # 1) Look for elements with data-sitekey attribute
+        """Try to find a reCAPTCHA sitekey on the page (cached per page URL)."""
+        parsed = urllib.parse.urlparse(self.driver.current_url)
+        cache_key = parsed.netloc + parsed.path
+        sitekey = self._sitekey_cache.get(cache_key)
+        if sitekey:
+            logger.debug(f"Using cached sitekey for {cache_key}: {sitekey}")
+            return sitekey
+
+        sitekey = self._detect_sitekey()
+        if sitekey:
+            self._sitekey_cache[cache_key] = sitekey
+        return sitekey
+
+    def _probe_recaptcha(self):
+        """Return ``{'iframe', 'container', 'sitekey'}`` for the current page in one script call."""
         try:
-            el = self.driver.find_elements(By.CSS_SELECTOR, "[data-sitekey]")
-            if el:
-                sitekey = el[0].get_attribute("data-sitekey")
-                if sitekey:
-                    logger.debug(f"Found sitekey via data-sitekey: {sitekey}")
-                    return sitekey
-        except Exception:
-            pass
-
-        # 2) Look for iframe src with k= parameter
-        try:
-            iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-            for iframe in iframes:
-                src = iframe.get_attribute("src") or ""
-                if "recaptcha" in src.lower():
-                    m = re.search(r"k=([^&]+)", src)
-                    if m:
-                        sitekey = urllib.parse.unquote(m.group(1))
-                        logger.debug(f"Found sitekey via iframe src: {sitekey}")
-                        return sitekey
-        except Exception:
-            pass
+            probe = self.driver.execute_script(
+                _PROBE_RECAPTCHA_JS, self._RECAPTCHA_IFRAME_CSS, self._RECAPTCHA_CONTAINER_CSS)
+            if probe:
+                return probe
+        except Exception as e:
+            logger.debug(f"reCAPTCHA probe failed: {e}")
+        return {"iframe": None, "container": False, "sitekey": None}
 
-        return None
+    def _detect_sitekey(self):
+        """Scan the current DOM for a reCAPTCHA sitekey."""
+        sitekey = self._probe_recaptcha().get("sitekey")
+        if sitekey:
+            logger.debug(f"Found sitekey in page: {sitekey}")
+        return sitekey
 
     def _is_driver_alive(self):
         """Return True if the webdriver session appears alive."""
@@ -203,10 +788,18 @@ class MawaqitUploader:
             logger.debug(f"Keep-alive script failed: {e}")
             return False
 
-    def _submit_2captcha(self, sitekey, page_url, timeout=None, poll_interval=5):
-        """Submit a userrecaptcha request to 2captcha and poll for the solution token."""
+    def _submit_2captcha(self, sitekey, page_url, timeout=None, initial_delay=15, poll_interval=2,
+                         max_poll_interval=6, backoff=1.5):
+        """Submit a userrecaptcha request to 2captcha and poll for the solution token.
+        After *initial_delay*, polls start every *poll_interval* seconds and back off by *backoff*
+        on each CAPCHA_NOT_READY up to *max_poll_interval*; *timeout* is a wall-clock budget."""
         if timeout is None:
             timeout = getattr(Config, "CAPTCHA_SOLVE_TIMEOUT", 180)
+
+        if (_RECAPTCHA_CACHE["token"] and _RECAPTCHA_CACHE["sitekey"] == sitekey
+                and time.monotonic() - _RECAPTCHA_CACHE["ts"] < _RECAPTCHA_TOKEN_MAX_AGE):
+            logger.info("Reusing unsubmitted 2Captcha solution from the previous attempt.")
+            return _RECAPTCHA_CACHE["token"]
         
         api_key = getattr(Config, "TWOCAPTCHA_API_KEY", None)
         if not api_key:
@@ -223,7 +816,7 @@ class MawaqitUploader:
         }
         try:
             logger.info("Submitting captcha to 2Captcha...")
-            r = requests.post(create_url, data=params, timeout=30)
+            r = self._http.post(create_url, data=params, timeout=30)
             r.raise_for_status()
             data = r.json()
             logger.debug(f"2Captcha submission response: {data}")
@@ -238,32 +831,40 @@ class MawaqitUploader:
 
         # Poll for result, keeping browser awake
         result_url = "http://2captcha.com/res.php"
-        end_time = time.time() + timeout
+        end_time = time.monotonic() + timeout
         logger.info("Waiting for 2Captcha to solve reCAPTCHA (this can take a while)...")
-        while time.time() < end_time:
+        # Solves rarely finish in under ~15s, so skip the guaranteed-miss polls up front
+        time.sleep(min(initial_delay, timeout))
+        result_params = {"key": api_key, "action": "get", "id": captcha_id, "json": 1}
+        interval = poll_interval
+        has_driver = hasattr(self, "driver")
+        while time.monotonic() < end_time:
             # keep browser alive before each poll attempt
-            if hasattr(self, "driver"):
+            if has_driver:
                 if not self._keep_browser_awake():
                     logger.warning("Browser session appears unresponsive while waiting for solver.")
                     # do not return yet; allow one final poll attempt but if driver is dead avoid injection later
             try:
-                params = {"key": api_key, "action": "get", "id": captcha_id, "json": 1}
-                r = requests.get(result_url, params=params, timeout=30)
+                r = self._http.get(result_url, params=result_params, timeout=30)
                 r.raise_for_status()
                 data = r.json()
-                logger.debug(f"2Captcha poll response: {data}")
+                logger.debug("2Captcha poll response: {}", data)
                 if data.get("status") == 1:
                     token = data.get("request")
                     logger.success("2Captcha returned a solution token.")
+                    _RECAPTCHA_CACHE.update(sitekey=sitekey, token=token, ts=time.monotonic())
                     return token
                 elif data.get("request") == "CAPCHA_NOT_READY":
                     logger.debug("2Captcha not ready yet, polling again...")
+                    interval = min(max_poll_interval, interval * backoff)
                 else:
                     logger.error(f"2Captcha returned error during poll: {data}")
                     return None
             except Exception as e:
-                logger.debug(f"Polling error: {e}")
-            time.sleep(poll_interval)
+                logger.debug("Polling error: {}", e)
+                # Transport hiccup, not solver progress: retry at the base cadence
+                interval = poll_interval
+            time.sleep(max(0, min(interval, end_time - time.monotonic())))
 
         logger.error("Timeout waiting for 2Captcha solution.")
         return None
@@ -271,88 +872,123 @@ class MawaqitUploader:
     def _inject_recaptcha_token(self, token):
         """Insert the g-recaptcha-response token into the page so server validation can proceed."""
         try:
-            js = """
-            (function(token){
-                var id = 'g-recaptcha-response';
-                var el = document.getElementById(id);
-                if(!el){
-                    el = document.createElement('textarea');
-                    el.id = id;
-                    el.name = id;
-                    el.style = 'display:none;';
-                    document.body.appendChild(el);
-                }
-                el.value = token;
-                // also set value on any existing element with that name
-                var els = document.getElementsByName('g-recaptcha-response');
-                for(var i=0;i<els.length;i++){ els[i].value = token; }
-                // Trigger change events
-                var evt = document.createEvent('HTMLEvents');
-                evt.initEvent('change', true, true);
-                el.dispatchEvent(evt);
-            })(arguments[0]);
-            """
-            self.driver.execute_script(js, token)
+            self.driver.execute_script(_INJECT_RECAPTCHA_TOKEN_JS, token)
             logger.info("Injected g-recaptcha-response token into the page.")
             return True
         except Exception as e:
             logger.error(f"Failed to inject reCAPTCHA token: {e}")
             return False
 
-    def _get_2fa_code_from_email(self, timeout=60):
-        """Fetch the most recent 2FA code from Gmail."""
+    def _open_gmail(self):
+        """Return the cached Gmail IMAP session with the inbox selected, logging in only when
+        there is none or it no longer answers."""
+        key = (_IMAP_HOST, Config.GMAIL_USER)
+        mail = _IMAP_SESSIONS.get(key)
+        if mail is not None:
+            try:
+                # Also makes Gmail report mail that arrived since the session was last used
+                mail.noop()
+                return mail
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.debug("Cached IMAP session is dead ({}), reconnecting...", e)
+                self._drop_gmail(mail)
+        mail = imaplib.IMAP4_SSL(_IMAP_HOST)
+        mail.login(Config.GMAIL_USER, Config.GMAIL_APP_PASSWORD)
+        mail.select("inbox")
+        _IMAP_SESSIONS[key] = mail
+        return mail
+
+    @staticmethod
+    def _drop_gmail(mail):
+        """Forget a broken IMAP session and log it out, ignoring errors from a dead connection."""
+        for key, cached in list(_IMAP_SESSIONS.items()):
+            if cached is mail:
+                del _IMAP_SESSIONS[key]
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+    def _get_2fa_code_from_email(self, timeout=60, poll_interval=5, sent_after=None):
+        """Fetch the most recent 2FA code from Gmail over one IMAP session, waiting in IDLE
+        (or polling, if IDLE is unavailable) until timeout.
+        With *sent_after* (aware datetime), only mail sent from then on is accepted, so there is
+        no need to sleep until the new email has surely arrived."""
+        mail = None
         try:
-            # Wait 30 seconds to ensure new email arrives
-            logger.info("Waiting 10 seconds for new 2FA email to arrive...")
-            time.sleep(10)
-            
             logger.info("Checking Gmail for 2FA code...")
-            mail = imaplib.IMAP4_SSL("imap.gmail.com")
-            mail.login(Config.GMAIL_USER, Config.GMAIL_APP_PASSWORD)
-            mail.select("inbox")
+            mail = self._open_gmail()
 
             # Format date for IMAP search (need only date part for SINCE)
             cutoff_date = (datetime.now() - timedelta(minutes=2)).strftime("%d-%b-%Y")
             logger.debug(f"Looking for emails since: {cutoff_date}")
             
-            # Search in steps to avoid syntax errors
+            # Anything older than this is a code from an earlier login attempt
+            now_utc = datetime.now(timezone.utc)
+            max_age = now_utc - sent_after if sent_after else timedelta(minutes=10)
+            # Gmail's search extension filters to the second (after:<epoch>), so stale codes never
+            # come back from SEARCH; plain IMAP SINCE is date-only and needs the Date check below
+            server_age_filter = "X-GM-EXT-1" in mail.capabilities
+            if server_age_filter:
+                after = int((now_utc - max_age).timestamp())
+                criteria = ('X-GM-RAW', f'"from:no-reply@mawaqit.net is:unread after:{after}"')
+            else:
+                criteria = ('UNSEEN', 'FROM', '"no-reply@mawaqit.net"', 'SINCE', cutoff_date)
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    # Let the server do the filtering: unread mail from Mawaqit since the cutoff
+                    _, data = mail.uid('SEARCH', None, *criteria)
+                    uid_list = data[0].strip()
+                    
+                    logger.debug("Found {} matching emails", uid_list.count(b' ') + 1 if uid_list else 0)
+                    
+                    if uid_list:
+                        # UIDs are ascending, so the last one is the most recent email;
+                        # peel it off the end instead of splitting the whole response
+                        latest_uid = uid_list.rsplit(None, 1)[-1]
+                        _, msg_data = mail.uid('FETCH', latest_uid, _TWO_FA_FETCH_PARTS)
+                        raw = b"".join(part[1] for part in msg_data if isinstance(part, tuple))
+                        email_message = email.message_from_bytes(raw)
+                        
+                        # Get email date for verification
+                        email_date = parsedate_to_datetime(email_message['date']) if email_message['date'] else None
+                        logger.debug("Processing email from: {}", email_date)
+                        if (server_age_filter or email_date is None
+                                or now_utc - email_date.astimezone(timezone.utc) <= max_age):
+                            break
+                        # Stale unread code: flag it so the next SEARCH skips it
+                        logger.debug("Skipping stale 2FA email from {}", email_date)
+                        mail.uid('STORE', latest_uid, '+FLAGS', '(\\Seen)')
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.error("No matching emails found")
+                        return None
+                    # Let the server push the new-mail notification instead of polling for it
+                    if imap_idle(mail, remaining) is None:
+                        time.sleep(poll_interval)
+                        # NOOP makes Gmail report mail that arrived since the last command
+                        mail.noop()
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    if time.monotonic() >= deadline:
+                        raise
+                    logger.debug("IMAP connection dropped ({}), reconnecting...", e)
+                    self._drop_gmail(mail)
+                    mail = self._open_gmail()
+            
             try:
-                # First find all emails from the sender
-                _, sender_msgs = mail.search(None, f'(FROM "no-reply@mawaqit.net")')
-                
-                # Then find recent emails
-                _, date_msgs = mail.search(None, f'(SINCE "{cutoff_date}")')
-                
-                # Convert message IDs to sets and find intersection
-                sender_ids = set(sender_msgs[0].split())
-                date_ids = set(date_msgs[0].split())
-                message_ids = sorted(list(sender_ids & date_ids), reverse=True)
-                
-                logger.debug(f"Found {len(message_ids)} matching emails")
-                
-                if not message_ids:
-                    logger.error("No matching emails found")
-                    return None
-                
-                # Get the most recent email
-                latest_email_id = message_ids[0]
-                _, msg_data = mail.fetch(latest_email_id, "(RFC822)")
-                email_body = msg_data[0][1]
-                email_message = email.message_from_bytes(email_body)
-                
-                # Get email date for verification
-                email_date = email.utils.parsedate_to_datetime(email_message['date'])
-                logger.debug(f"Processing email from: {email_date}")
-
                 # Extract code from email body
                 for part in email_message.walk():
                     if part.get_content_type() == "text/plain":
-                        body = part.get_payload(decode=True).decode()
+                        # The code is near the top; cap what the regex has to scan
+                        body = part.get_payload(decode=True)[:_TWO_FA_MAX_BODY_BYTES].decode(errors="ignore")
                         # Look for 6-digit code
-                        match = re.search(r'\b(\d{6})\b', body)
-                        if match:
-                            code = match.group(1)
+                        code = find_2fa_code(body)
+                        if code:
                             logger.success(f"Found authentication code: {code}")
+                            # Mark consumed so the next login doesn't pick up a stale code
+                            mail.uid('STORE', latest_uid, '+FLAGS', '(\\Seen)')
                             return code
 
                 logger.error("No 6-digit code found in email body")
@@ -364,20 +1000,37 @@ class MawaqitUploader:
 
         except Exception as e:
             logger.error(f"Error in email processing: {str(e)}")
+            # The session may be mid-command; don't hand it to the next lookup
+            if mail is not None:
+                self._drop_gmail(mail)
             return None
-        finally:
-            try:
-                mail.close()
-                mail.logout()
-            except Exception:
-                pass
+
+    @staticmethod
+    def _write_bytes(path, data):
+        with open(path, "wb") as fh:
+            fh.write(data)
+
+    def _grab_screenshot(self):
+        """Return ``(bytes, extension)`` for the current viewport.
+        JPEG at quality 60 via CDP is far cheaper for Chrome to encode than PNG; PNG is the fallback."""
+        try:
+            shot = self.driver.execute_cdp_cmd(
+                "Page.captureScreenshot", {"format": "jpeg", "quality": self._SCREENSHOT_JPEG_QUALITY})
+            return base64.b64decode(shot["data"]), "jpg"
+        except Exception as e:
+            logger.debug(f"JPEG capture unavailable ({e}); falling back to PNG")
+            return self.driver.get_screenshot_as_png(), "png"
 
     def _save_debug_screenshot(self, name):
-        """Save a debug screenshot with timestamp."""
+        """Save a debug screenshot with timestamp (DEBUG_MODE only).
+        The image is captured synchronously; the disk write happens on the I/O thread."""
+        if not Config.DEBUG_MODE:
+            return
         try:
-            timestamp = datetime.now().strftime("%H%M%S")
-            filename = f"debug_{name}_{timestamp}.png"
-            self.driver.save_screenshot(filename)
+            timestamp = time.strftime("%H%M%S")
+            data, ext = self._grab_screenshot()
+            filename = f"debug_{name}_{timestamp}.{ext}"
+            self._io_pool.submit(self._write_bytes, filename, data)
             logger.debug(f"Saved screenshot: {filename}")
         except Exception as e:
             logger.debug(f"Failed to save screenshot: {e}")
@@ -419,7 +1072,7 @@ class MawaqitUploader:
                                     'headers': request.get('headers', {}),
                                     'postData': request.get('postData', 'N/A')
                                 })
-                                logger.debug(f"🔵 REQUEST: {req_method} {url}")
+                                logger.debug("🔵 REQUEST: {} {}", req_method, url)
                         
                         # Response details
                         elif method == 'Network.responseReceived':
@@ -428,7 +1081,7 @@ class MawaqitUploader:
                             status = response.get('status', 0)
                             
                             if 'csv' in url.lower() or 'upload' in url.lower() or 'file' in url.lower():
-                                logger.debug(f"🟢 RESPONSE: {status} {url}")
+                                logger.debug("🟢 RESPONSE: {} {}", status, url)
                                 if status >= 400:
                                     errors.append({
                                         'url': url,
@@ -495,7 +1148,7 @@ class MawaqitUploader:
                     logger.warning(f"  🟡 {message}")
                 else:
                     info.append(message)
-                    logger.debug(f"  ℹ️ {message}")
+                    logger.debug("  ℹ️ {}", message)
             
             logger.info(f"Console errors: {len(errors)}, warnings: {len(warnings)}, info: {len(info)}")
             logger.info("=" * 80)
@@ -602,7 +1255,7 @@ class MawaqitUploader:
                         if key != 'innerHTML':
                             logger.info(f"  {key}: {val}")
                         else:
-                            logger.debug(f"  Form HTML preview: {val}...")
+                            logger.debug("  Form HTML preview: {}...", val)
                 else:
                     logger.warning("  No parent form found")
             except Exception as e:
@@ -651,32 +1304,57 @@ class MawaqitUploader:
         except Exception as e:
             logger.error(f"Error inspecting file input context: {e}")
 
+    def _visible_text_head(self, max_chars):
+        """Return the first *max_chars* characters of the page's visible text.
+        Sliced in the browser so the full body text is never serialized over WebDriver."""
+        return self.driver.execute_script(
+            "return (document.body && document.body.innerText || '').slice(0, arguments[0]);", max_chars) or ""
+
     def _log_debug_state(self, context=""):
         """Log current page state for debugging."""
         try:
-            timestamp = time.strftime("%H%M%S")
-            screenshot_path = f"debug_{context}_{timestamp}.png"
-            self.driver.save_screenshot(screenshot_path)
-            logger.debug(f"Screenshot saved: {screenshot_path}")
+            self._save_debug_screenshot(context)
             
             logger.debug(f"Current URL: {self.driver.current_url}")
             logger.debug(f"Page title: {self.driver.title}")
             
             # Log visible text
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text
+            body_text = self._visible_text_head(2000)
             logger.debug("Visible text on page:")
             for line in body_text.split('\n')[:10]:  # First 10 lines
-                logger.debug(f"  > {line}")
+                logger.debug("  > {}", line)
                 
             # Log input fields
             inputs = self.driver.find_elements(By.TAG_NAME, "input")
             logger.debug("Input fields found:")
             for inp in inputs:
-                logger.debug(f"  > {inp.get_attribute('name')} - {inp.get_attribute('type')} - {inp.get_attribute('placeholder')}")
+                logger.opt(lazy=True).debug("  > {} - {} - {}", lambda: inp.get_attribute('name'),
+                                            lambda: inp.get_attribute('type'), lambda: inp.get_attribute('placeholder'))
                 
         except Exception as e:
             logger.error(f"Error logging debug state: {e}")
 
+    def _wait_for_document_ready(self, timeout=10):
+        """Wait until document.readyState is 'complete'. Returns False on timeout."""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            return True
+        except Exception as e:
+            logger.debug(f"Document not ready after {timeout}s: {e}")
+            return False
+
+    def _wait_for_collapse_settled(self, timeout=5):
+        """Wait until no Bootstrap collapse animation is in progress (no '.collapsing' element)."""
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda d: not d.find_elements(By.CSS_SELECTOR, ".collapsing")
+            )
+            return True
+        except Exception:
+            return False
+
     def _wait_for_url_change(self, expected_urls, timeout=30, on_match=None):
         """Wait for URL to contain any of expected_urls; log and return True on success.
         If on_match is provided it will be called immediately after a match is detected.
@@ -710,47 +1388,47 @@ class MawaqitUploader:
         """
         try:
             logger.info("Attempting to locate a visible 'Login' control (button/link/input/role=button)...")
-            # Selenium-level tries for common element types first (fast)
-            candidates = []
-            candidates += self.driver.find_elements(By.XPATH, "//button")
-            candidates += self.driver.find_elements(By.XPATH, "//a")
-            candidates += self.driver.find_elements(By.XPATH, "//input[@type='submit' or @type='button']")
-            candidates += self.driver.find_elements(By.CSS_SELECTOR, "[role='button']")
-
-            def visible_text_matches(el):
-                try:
-                    if not el.is_displayed():
-                        return False
-                    txt = (el.text or el.get_attribute("value") or "").strip().lower()
-                    return "login" == txt or txt.startswith("login") or "login" in txt
-                except Exception:
-                    return False
-
-            for el in candidates:
+            # One script call finds the first visible control whose text/value mentions "login",
+            # checking buttons, then links, then submit/button inputs, then role=button, in that
+            # order; a native click is then tried on it before falling back to a JS click
+            el = self.driver.execute_script(
+                """
+                var groups = arguments[0];
+                function visible(el) {
+                    var style = window.getComputedStyle(el);
+                    if (style.display === 'none' || style.visibility === 'hidden') return false;
+                    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+                }
+                for (var g = 0; g < groups.length; g++) {
+                    var els = document.querySelectorAll(groups[g]);
+                    for (var i = 0; i < els.length; i++) {
+                        var txt = (els[i].innerText || els[i].value || '').trim().toLowerCase();
+                        if (txt.indexOf('login') !== -1 && visible(els[i])) return els[i];
+                    }
+                }
+                return null;
+                """,
+                list(self._LOGIN_CONTROL_GROUPS),
+            )
+            if el is not None:
+                logger.opt(lazy=True).debug("Found visible candidate element: tag={} text='{}'",
+                                            lambda: el.tag_name, lambda: el.text)
                 try:
-                    if visible_text_matches(el):
-                        logger.debug(f"Found visible candidate element: tag={el.tag_name} text='{el.text}'")
-                        try:
-                            self.driver.execute_script("arguments[0].scrollIntoView({block:'center',inline:'nearest'});", el)
-                        except Exception:
-                            pass
-                        try:
-                            el.click()
-                            logger.success("Clicked login control via Selenium element.click()")
-                        except Exception as e:
-                            logger.debug(f"Element.click() failed: {e}; trying JS click fallback on the element")
-                            try:
-                                self.driver.execute_script("arguments[0].click();", el)
-                                logger.success("Clicked login control via JS on element")
-                            except Exception as e2:
-                                logger.debug(f"JS click on element failed: {e2}")
-                                continue
+                    self.driver.execute_script("arguments[0].scrollIntoView({block:'center',inline:'nearest'});", el)
+                    el.click()
+                    logger.success("Clicked login control via Selenium element.click()")
+                    return True
+                except Exception as e:
+                    logger.debug(f"Element.click() failed: {e}; trying JS click fallback on the element")
+                    try:
+                        self.driver.execute_script("arguments[0].click();", el)
+                        logger.success("Clicked login control via JS on element")
                         return True
-                except Exception:
-                    continue
+                    except Exception as e2:
+                        logger.debug(f"JS click on element failed: {e2}")
 
             # If no Selenium candidate matched, use a robust JS fallback:
-            logger.info("Selenium search did not find a clear candidate — running JS fallback to click visible element by text.")
+            logger.info("No clickable login-labelled control — running JS fallback on card/form buttons.")
             js_clicker = """
             (function(){
                 function isVisible(el){
@@ -765,7 +1443,7 @@ class MawaqitUploader:
                     if(!isVisible(el)) continue;
                     var txt = (el.innerText || el.value || '').trim().toLowerCase();
                     for(var j=0;j<texts.length;j++){
-                        if(txt === texts[j] || txt.indexOf(texts[j]) !== -1){
+                        if(txt.indexOf(texts[j]) !== -1){
                             el.scrollIntoView({block:'center'});
                             el.click();
                             return true;
@@ -837,7 +1515,7 @@ class MawaqitUploader:
                         try:
                             on_match()
                         except Exception as e:
-                            logger.debug(f"on_match callback error: {e}")
+                            logger.debug("on_match callback error: {}", e)
                     return True
 
                 # fallback heuristics: canonical link, visible anchor/logo to /en
@@ -852,7 +1530,7 @@ class MawaqitUploader:
                                 try:
                                     on_match()
                                 except Exception as e:
-                                    logger.debug(f"on_match callback error: {e}")
+                                    logger.debug("on_match callback error: {}", e)
                             return True
                 except Exception:
                     pass
@@ -867,7 +1545,7 @@ class MawaqitUploader:
                                     try:
                                         on_match()
                                     except Exception as e:
-                                        logger.debug(f"on_match callback error: {e}")
+                                        logger.debug("on_match callback error: {}", e)
                                 return True
                         except Exception:
                             continue
@@ -887,8 +1565,10 @@ class MawaqitUploader:
             logger.debug(f"_wait_for_en_landing error: {e}")
             return False
 
-    def _handle_2fa(self, timeout=60):
-        """Handle 2FA verification on the /security/2fa page."""
+    def _handle_2fa(self, timeout=60, submitted_at=None):
+        """Handle 2FA verification on the /security/2fa page.
+        *submitted_at* (aware datetime) is when the login form was submitted, i.e. when the code
+        was mailed; without it the cutoff is taken from now."""
         try:
             if "/security/2fa" not in self.driver.current_url:
                 logger.error(f"Not on 2FA page. Current URL: {self.driver.current_url}")
@@ -897,49 +1577,32 @@ class MawaqitUploader:
             logger.info("On 2FA verification page, looking for input field...")
             
             # Look for input field - it's the only input on the page
-            input_selectors = [
-                (By.CSS_SELECTOR, "input[type='text']"),
-                (By.XPATH, "//h1[contains(text(),'Two-factor authentication')]/..//input"),
-                (By.XPATH, "//div[contains(text(),'6-digit code')]/following::input[1]")
-            ]
-
-            two_fa_input = None
-            for by, selector in input_selectors:
-                try:
-                    two_fa_input = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((by, selector))
-                    )
-                    if two_fa_input and two_fa_input.is_displayed():
-                        logger.success(f"Found 2FA input using {by}={selector}")
-                        break
-                except Exception:
-                    two_fa_input = None
-                    continue
+            try:
+                two_fa_input = self._find_element_with_selectors(self._TWO_FA_INPUT_SELECTORS, timeout=10,
+                                                                 condition=EC.visibility_of_element_located)
+                logger.success("Found 2FA input")
+            except Exception:
+                two_fa_input = None
 
             if not two_fa_input:
                 logger.error("Could not find 2FA input field")
                 self._save_debug_screenshot("no_2fa_input")
                 return False
 
-            # Wait a short extra time so the correct email/code arrives if needed
-            extra_wait = getattr(Config, "EXTRA_2FA_EMAIL_WAIT", 30)
-            logger.info(f"Waiting additional {extra_wait}s to ensure latest email arrives...")
-            time.sleep(extra_wait)
+            # The code was mailed when the login form was submitted, which can be a minute before
+            # this page was found; the slack absorbs clock skew against the mail server's Date header
+            sent_after = (submitted_at or datetime.now(timezone.utc)) - timedelta(minutes=1)
 
-            logger.info("Checking Gmail for 2FA code...")
-            code = self._get_2fa_code_from_email(timeout)
+            code = self._get_2fa_code_from_email(timeout, sent_after=sent_after)
             if not code:
                 logger.error("Failed to get 2FA code from email")
                 self._save_debug_screenshot("2fa_no_code")
                 return False
 
-            # Enter the code with visible typing and dispatch events
+            # The verification form accepts the code in one go; no need to type it digit by digit
             logger.info(f"Entering 2FA code: {code}")
             two_fa_input.clear()
-            for ch in code:
-                two_fa_input.send_keys(ch)
-                logger.debug(f"Typed digit: {ch}")
-                time.sleep(0.18)
+            two_fa_input.send_keys(code)
 
             # Dispatch input/change and blur so client-side listeners update
             try:
@@ -984,32 +1647,26 @@ class MawaqitUploader:
         """Locate and click the top 'Admin' control in the header. Returns True on success."""
         try:
             logger.info("Looking for Admin link/button in header...")
-            selectors = [
-                (By.LINK_TEXT, "ADMIN"),
-                (By.LINK_TEXT, "Admin"),
-                (By.XPATH, "//a[contains(translate(normalize-space(.),'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'),'ADMIN')]"),
-                (By.CSS_SELECTOR, "a[href*='/admin']"),
-                (By.XPATH, "//nav//a[contains(@href, '/admin')]"),
-            ]
 
-            for by, sel in selectors:
+            # All selectors are polled together rather than 2s apiece in turn
+            try:
+                el = self._find_element_with_selectors(self._ADMIN_SELECTORS, timeout=timeout,
+                                                       condition=EC.element_to_be_clickable,
+                                                       stats_key="admin")
+                logger.debug("Clicking Admin control")
                 try:
-                    el = WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable((by, sel)))
-                    if el and el.is_displayed():
-                        logger.debug(f"Clicking Admin control via selector: {by}={sel}")
-                        try:
-                            self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
-                        except Exception:
-                            pass
-                        try:
-                            el.click()
-                        except Exception:
-                            # fallback JS click
-                            self.driver.execute_script("arguments[0].click();", el)
-                        logger.success("Clicked Admin control")
-                        return True
+                    self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
                 except Exception:
-                    continue
+                    pass
+                try:
+                    el.click()
+                except Exception:
+                    # fallback JS click
+                    self.driver.execute_script("arguments[0].click();", el)
+                logger.success("Clicked Admin control")
+                return True
+            except Exception:
+                pass
 
             # JS fallback: search by visible text and click the first match
             logger.info("Admin not found via selectors — trying JS fallback")
@@ -1101,102 +1758,86 @@ class MawaqitUploader:
             logger.debug(f"_is_on_en_landing check error: {e}")
         return False
 
+    def _wait_for_configure_page(self, timeout=15):
+        """Wait for the element the next step needs rather than a fixed delay."""
+        logger.info("Waiting for the configure page to show 'Calculation of prayer times'...")
+        try:
+            self._find_element_with_selectors(
+                tuple((By.XPATH, xp) for xp in self._CALC_SECTION_XPATHS[:2]),
+                timeout=timeout, condition=EC.visibility_of_element_located)
+        except Exception:
+            logger.warning("Calculation section not visible yet; continuing")
+
     def _click_actions_and_configure(self, timeout=10):
         """Locate a visible 'Actions' button on the admin card and click the 'Configure' menu item.
         Returns True on success, False otherwise.
         """
         try:
-            logger.info("Looking for visible 'Actions' button on mosque card...")
-            # Strategy 1: visible button elements containing 'Actions'
-            candidates = self.driver.find_elements(By.XPATH, "//button[contains(normalize-space(.),'Actions') or contains(normalize-space(.),'Action')]")
-            # include links that may act as buttons
-            candidates += self.driver.find_elements(By.XPATH, "//a[contains(normalize-space(.),'Actions') or contains(normalize-space(.),'Action')]")
+            # Already on the configure form (e.g. a retry in the same session): nothing to click
+            if "/configure" in (self.driver.current_url or ""):
+                calc_section, _ = self._first_visible_by_xpath(self._CALC_SECTION_XPATHS[:2])
+                if calc_section:
+                    logger.success("Already on the Configure page; skipping Actions -> Configure.")
+                    return True
 
-            btn = None
-            for el in candidates:
-                try:
-                    if el.is_displayed() and el.is_enabled():
-                        btn = el
-                        logger.debug(f"Found Actions candidate: tag={el.tag_name} text='{el.text}'")
-                        break
-                except Exception:
-                    continue
+            # The Configure item is usually a plain link already in the DOM (the dropdown only
+            # toggles its visibility); navigating to it skips both menu clicks and their waits
+            configure_href = self.driver.execute_script(
+                "var a = document.querySelector(arguments[0]); return a ? a.href : null;",
+                self._CONFIGURE_LINK_CSS)
+            if configure_href:
+                logger.info(f"Opening configure page directly: {configure_href}")
+                self.driver.get(configure_href)
+                self._wait_for_configure_page()
+                logger.success("Opened Configure page via its link.")
+                return True
 
-            # Fallback: search within card elements for a button labelled "Actions"
-            if not btn:
-                logger.debug("No immediate Actions button found, scanning card areas...")
-                card_buttons = self.driver.find_elements(By.XPATH, "//div[contains(@class,'card')]//button")
-                for el in card_buttons:
-                    try:
-                        txt = (el.text or "").strip().lower()
-                        if "action" in txt:
-                            if el.is_displayed() and el.is_enabled():
-                                btn = el
-                                break
-                    except Exception:
-                        continue
+            logger.info("Looking for visible 'Actions' button on mosque card...")
+            # Visible buttons (or links acting as buttons) labelled exactly 'Actions', then anything
+            # containing 'Action', then card buttons mentioning it; one in-page lookup for all three
+            btn, sel = self._first_visible_by_xpath(self._ACTIONS_BUTTON_XPATHS)
+            if btn:
+                logger.opt(lazy=True).debug("Found Actions candidate: tag={} text='{}' via {}",
+                                            lambda: btn.tag_name, lambda: btn.text, lambda: sel)
 
             if not btn:
                 logger.warning("Could not find an Actions button on the page.")
                 self._save_debug_screenshot("actions_not_found")
                 return False
 
-            # Click the Actions button (use JS fallback if standard click fails)
+            # Click the Actions button (use JS fallback if standard click fails).
+            # A native click already scrolls the button into view and dispatches real mouse
+            # events, so the former hover + 0.2s pause was only adding a round-trip and a delay.
             logger.info("Clicking the Actions button...")
             try:
-                # Try a visible move + click to mimic user
-                actions = ActionChains(self.driver)
-                actions.move_to_element(btn).pause(0.2).click().perform()
+                btn.click()
             except Exception as e:
-                logger.debug(f"ActionChains click failed: {e}; trying element.click()")
+                logger.debug(f"element.click() failed: {e}; trying JS click")
                 try:
-                    btn.click()
-                except Exception as e:
-                    logger.debug(f"element.click() failed: {e}; trying JS click")
-                    try:
-                        self.driver.execute_script("arguments[0].click();", btn)
-                    except Exception as e3:
-                        logger.error(f"Failed to click Actions button: {e3}")
-                        self._save_debug_screenshot("actions_click_failed")
-                        return False
+                    self.driver.execute_script("arguments[0].click();", btn)
+                except Exception as e2:
+                    logger.error(f"Failed to click Actions button: {e2}")
+                    self._save_debug_screenshot("actions_click_failed")
+                    return False
 
             # Wait for dropdown / menu to appear with 'Configure' item
             logger.info("Waiting for 'Configure' menu item to appear...")
-            menu_selectors = [
-                (By.XPATH, "//a[normalize-space(.)='Configure']"),
-                (By.XPATH, "//button[normalize-space(.)='Configure']"),
-                (By.XPATH, "//li//a[normalize-space(.)='Configure']"),
-                (By.XPATH, "//div[contains(@class,'dropdown-menu')]//a[contains(normalize-space(.),'Configure')]"),
-                (By.XPATH, "//div[contains(@class,'dropdown-menu')]//button[contains(normalize-space(.),'Configure')]"),
-                (By.XPATH, "//*[contains(normalize-space(.),'Configure') and (self::a or self::button or ancestor::li)]")
-            ]
 
-            config_el = None
-            wait = WebDriverWait(self.driver, timeout)
-            for by, sel in menu_selectors:
-                try:
-                    config_el = wait.until(EC.element_to_be_clickable((by, sel)))
-                    if config_el and config_el.is_displayed():
-                        logger.debug(f"Found Configure menu item using {by}={sel}")
-                        break
-                except Exception:
-                    config_el = None
-                    continue
+            # One wait across all menu selectors; a later selector no longer waits out the earlier ones
+            try:
+                config_el = self._find_element_with_selectors(self._CONFIGURE_MENU_SELECTORS, timeout=timeout,
+                                                              condition=EC.element_to_be_clickable,
+                                                              stats_key="configure_menu")
+                logger.debug("Found Configure menu item")
+            except Exception:
+                config_el = None
 
             if not config_el:
                 # As a final fallback, try to locate any visible menu item containing 'configure' text
-                try:
-                    all_menu_el = self.driver.find_elements(By.XPATH, "//*[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'configure')]")
-                    for el in all_menu_el:
-                        try:
-                            if el.is_displayed() and el.is_enabled():
-                                config_el = el
-                                logger.debug("Found Configure-like element via fallback visible search")
-                                break
-                        except Exception:
-                            continue
-                except Exception:
-                    pass
+                config_el, _ = self._first_visible_by_xpath(self._CONFIGURE_FALLBACK_XPATHS,
+                                                            max_text_len=self._CONFIGURE_FALLBACK_MAX_TEXT)
+                if config_el:
+                    logger.debug("Found Configure-like element via fallback visible search")
 
             if not config_el:
                 logger.error("Could not find 'Configure' in Actions dropdown.")
@@ -1206,9 +1847,8 @@ class MawaqitUploader:
             # Click Configure
             logger.info("Clicking 'Configure'...")
             try:
-                # Scroll into view + click
+                # Scroll into view + native click
                 self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", config_el)
-                time.sleep(0.2)
                 config_el.click()
             except Exception as e:
                 logger.debug(f"Direct click failed: {e}; trying JS click")
@@ -1219,9 +1859,7 @@ class MawaqitUploader:
                     self._save_debug_screenshot("configure_click_failed")
                     return False
 
-            # Wait briefly for configure page/modal to load
-            logger.info("Waiting briefly for configure page/modal to appear...")
-            time.sleep(1.0)
+            self._wait_for_configure_page()
             logger.success("Clicked Configure from Actions dropdown.")
             return True
 
@@ -1231,29 +1869,22 @@ class MawaqitUploader:
             return False
 
     def _get_month_name(self):
-        """Return current month name (e.g. 'November')."""
-        return datetime.now().strftime("%B")
+        """Return current month name (e.g. 'November').
+        Resolved once per instance so a run that crosses midnight on the last day
+        of a month keeps uploading the month it started with."""
+        if self._month_name is None:
+            self._month_name = datetime.now().strftime("%B")
+        return self._month_name
 
     def _possible_month_labels(self, month_name):
-        """Return a list of possible displayed labels for the given English month name.
-        Add localized variants (French) that the site may use.
+        """Return (label, xpath) pairs for the displayed labels of the given English month name.
+        Known months come from the precomputed table; anything else falls back to case variants.
         """
-        # Minimal mapping; extend if you see other variants/languages on the site
-        mapping = {
-            "January":   ["January", "Janvier"],
-            "February":  ["February", "Février", "Fevrier"],
-            "March":     ["March", "Mars"],
-            "April":     ["April", "Avril"],
-            "May":       ["May", "Mai"],
-            "June":      ["June", "Juin"],
-            "July":      ["July", "Juillet"],
-            "August":    ["August", "Août", "Aout"],
-            "September": ["September", "Septembre"],
-            "October":   ["October", "Octobre"],
-            "November":  ["November", "Novembre"],
-            "December":  ["December", "Décembre", "Decembre"]
-        }
-        return mapping.get(month_name, [month_name, month_name.lower(), month_name.capitalize()])
+        cached = _MONTH_LABEL_XPATHS.get(month_name)
+        if cached is not None:
+            return cached
+        return tuple((label, _month_label_xpath(label))
+                     for label in (month_name, month_name.lower(), month_name.capitalize()))
 
     def _download_month_csvs(self, month_name):
         """Download athan and iqama CSVs for the given month from the GitHub raw repo.
@@ -1268,34 +1899,46 @@ class MawaqitUploader:
             out_dir = getattr(Config, "PRAYER_TIMES_DIR", "./prayer-times")
             os.makedirs(out_dir, exist_ok=True)
 
-            paths = {}
-            for key, fname in names.items():
+            def fetch(fname):
                 url = base + fname
                 logger.info(f"📥 Downloading {fname} from GitHub...")
                 logger.debug(f"   URL: {url}")
                 try:
-                    r = requests.get(url, timeout=30)
+                    r = self._http.get(url, timeout=30)
                     if r.status_code == 200:
                         local = os.path.join(out_dir, fname)
                         with open(local, "wb") as fh:
                             fh.write(r.content)
                         
-                        # Verify file was written
-                        file_size = os.path.getsize(local)
+                        file_size = len(r.content)
                         logger.success(f"✓ Saved {fname} ({file_size} bytes)")
                         logger.debug(f"   Local path: {os.path.abspath(local)}")
+                        text = r.content.decode('utf-8', errors='replace')
+                        
+                        # Parse from the bytes we already have so _read_prayer_csv never
+                        # has to read the file back from disk, and reject a file the upload
+                        # could not use before any browser work (or captcha solve) depends on it
+                        try:
+                            columns, rows = parsed = self._parse_prayer_csv(io.StringIO(text, newline=''))
+                        except Exception as e:
+                            logger.error(f"Could not parse {fname}: {e}")
+                            return None
+                        missing = [name for name in self._REQUIRED_CSV_COLUMNS if name not in columns]
+                        if missing or not rows:
+                            logger.error(f"{fname} is unusable: missing columns {missing}, {len(rows)} rows")
+                            return None
+                        self._csv_cache[(local, os.stat(local).st_mtime_ns)] = parsed
                         
                         # Log first few lines of CSV for verification
                         try:
-                            with open(local, 'r') as f:
-                                first_lines = [f.readline().strip() for _ in range(3)]
-                                logger.debug(f"   First 3 lines of CSV:")
-                                for i, line in enumerate(first_lines, 1):
-                                    logger.debug(f"     {i}. {line[:80]}...")
+                            first_lines = text.splitlines()[:3]
+                            logger.debug(f"   First 3 lines of CSV:")
+                            for i, line in enumerate(first_lines, 1):
+                                logger.debug("     {}. {}...", i, line.strip()[:80])
                         except Exception:
                             pass
                         
-                        paths[key] = local
+                        return local
                     else:
                         logger.error(f"Failed to download {fname}: HTTP {r.status_code}")
                         logger.debug(f"   Response: {r.text[:200]}")
@@ -1303,11 +1946,40 @@ class MawaqitUploader:
                 except Exception as e:
                     logger.error(f"Exception downloading {fname}: {e}")
                     return None
+
+            # Athan and iqama files are independent, so fetch them concurrently
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                futures = {key: pool.submit(fetch, fname) for key, fname in names.items()}
+                paths = {key: future.result() for key, future in futures.items()}
+            if not all(paths.values()):
+                return None
             return paths
         except Exception as e:
             logger.error(f"Error in _download_month_csvs: {e}")
             return None
 
+    def _read_prayer_csv(self, path):
+        """Read a prayer times CSV in one pass, reusing the parse while the file is unchanged.
+        Returns (columns, rows): a {header name: index} map and the non-empty rows as lists.
+        """
+        key = (path, os.stat(path).st_mtime_ns)
+        cached = self._csv_cache.get(key)
+        if cached is not None:
+            return cached
+        with open(path, 'r', newline='') as f:
+            parsed = self._parse_prayer_csv(f)
+        self._csv_cache[key] = parsed
+        return parsed
+
+    @staticmethod
+    def _parse_prayer_csv(lines):
+        """Parse CSV lines (an open file or StringIO) into ({header name: index}, non-empty rows)."""
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        rows = [row for row in reader if row]
+        columns = {name.strip(): i for i, name in enumerate(header)}
+        return columns, rows
+
     def _get_day_1_fajr_value(self, month_name):
         """
         Robustly finds the Fajr time for Day 1 in the currently visible month's table.
@@ -1348,34 +2020,22 @@ class MawaqitUploader:
             logger.info("=" * 60)
             logger.info(f"📄 File to upload: {athan_filepath}")
             logger.info(f"📂 Absolute path: {os.path.abspath(athan_filepath)}")
-            logger.info(f"📊 File exists: {os.path.exists(athan_filepath)}")
-            if os.path.exists(athan_filepath):
-                logger.info(f"📦 File size: {os.path.getsize(athan_filepath)} bytes")
+            # One stat() answers both "exists?" and "how big?"
+            try:
+                file_size = os.stat(athan_filepath).st_size
+            except OSError:
+                file_size = None
+            logger.info(f"📊 File exists: {file_size is not None}")
+            if file_size is not None:
+                logger.info(f"📦 File size: {file_size} bytes")
             logger.info("=" * 60)
             
             # Step 1: Click "Calculation of prayer times" section to expand it
             logger.info("Looking for 'Calculation of prayer times' section header...")
-            calc_section = None
-            
             # Try to find the clickable header
-            calc_selectors = [
-                "//*[normalize-space(.)='Calculation of prayer times']",
-                "//*[contains(@class, 'panel-heading') and contains(., 'Calculation of prayer times')]",
-                "//*[contains(normalize-space(.), 'Calculation of prayer times')]"
-            ]
-            
-            for sel in calc_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, sel)
-                    for el in elements:
-                        if el.is_displayed():
-                            calc_section = el
-                            logger.debug(f"Found calculation section with selector: {sel}")
-                            break
-                    if calc_section:
-                        break
-                except Exception:
-                    continue
+            calc_section, sel = self._first_visible_by_xpath(self._CALC_SECTION_XPATHS, cache_key="calc_section")
+            if calc_section:
+                logger.debug(f"Found calculation section with selector: {sel}")
             
             if not calc_section:
                 logger.error("Could not find 'Calculation of prayer times' section")
@@ -1386,7 +2046,6 @@ class MawaqitUploader:
             logger.info("Clicking 'Calculation of prayer times' to expand it...")
             try:
                 self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", calc_section)
-                time.sleep(0.3)
                 calc_section.click()
                 logger.success("Clicked 'Calculation of prayer times'")
             except Exception as e:
@@ -1400,17 +2059,15 @@ class MawaqitUploader:
                     return False
             
             # Wait for the section to expand
-            time.sleep(1.0)
+            self._wait_for_collapse_settled()
 
             # Step 2: Now find and click the month accordion INSIDE the expanded calculation section
-            labels = self._possible_month_labels(month_name)
+            label_xpaths = self._possible_month_labels(month_name)
+            labels = [label for label, _ in label_xpaths]
             logger.info(f"Opening month accordion for {month_name} — trying labels: {labels}")
             month_el = None
 
-            for label in labels:
-                lower = label.lower()
-                # Look specifically inside the calculation section that we just expanded
-                xpath_contains = f"//*[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), '{lower}')]"
+            for label, xpath_contains in label_xpaths:
                 try:
                     candidates = self.driver.find_elements(By.XPATH, xpath_contains)
                     for el in candidates:
@@ -1420,14 +2077,14 @@ class MawaqitUploader:
                                 # Make sure we're getting the month accordion, not other text
                                 if txt and len(txt) < 30:  # Month names are short
                                     month_el = el
-                                    logger.debug(f"Matched month label '{label}' with element text: '{txt}'")
+                                    logger.debug("Matched month label '{}' with element text: '{}'", label, txt)
                                     break
                         except Exception:
                             continue
                     if month_el:
                         break
                 except Exception as e:
-                    logger.debug(f"XPath search for label '{label}' failed: {e}")
+                    logger.debug("XPath search for label '{}' failed: {}", label, e)
                     continue
 
             if not month_el:
@@ -1438,11 +2095,12 @@ class MawaqitUploader:
             # The found element may be a child span/text node inside the actual accordion toggle.
             # Traverse up the DOM to find an ancestor that has data-bs-target (Bootstrap 5),
             # data-target, or href — the real Bootstrap accordion toggle button/link.
-            actual_toggle = self._resolve_accordion_toggle(month_el)
+            # The target is kept for locating the month's input panel after the click
+            actual_toggle, month_target = self._resolve_accordion_toggle(month_el)
             if actual_toggle:
                 month_el = actual_toggle
-                logger.debug(f"Resolved accordion toggle: tag={month_el.tag_name}, "
-                             f"target={month_el.get_attribute('data-bs-target') or month_el.get_attribute('data-target') or month_el.get_attribute('href')}")
+                logger.opt(lazy=True).debug(
+                    "Resolved accordion toggle: tag={}, target={}", lambda: month_el.tag_name, lambda: month_target)
             else:
                 logger.warning("Could not find accordion toggle ancestor with data-bs-target/data-target/href; "
                                "proceeding with original element")
@@ -1450,93 +2108,16 @@ class MawaqitUploader:
             # Click to expand the month accordion - with detailed debugging
             logger.info(f"Opening month accordion for {month_name}...")
             try:
-                # Check the current state before clicking
-                before_state = self.driver.execute_script("""
-                    var el = arguments[0];
-                    var ariaExpanded = el.getAttribute('aria-expanded');
-                    var classList = el.className;
-                    
-                    // Find associated panel (Bootstrap 5: data-bs-target, Bootstrap 3/4: data-target or href)
-                    var target = el.getAttribute('data-bs-target') || el.getAttribute('data-target') || el.getAttribute('href');
-                    var panel = target ? document.querySelector(target) : null;
-                    var panelVisible = panel ? panel.classList.contains('show') : false;
-                    
-                    return {
-                        ariaExpanded: ariaExpanded,
-                        classList: classList,
-                        target: target,
-                        panelVisible: panelVisible
-                    };
-                """, month_el)
+                # Scroll + click (only if the panel is closed) in one call, let the collapse
+                # animation finish, then force the panel open if the click didn't do it
+                before_state = self.driver.execute_script(
+                    _OPEN_ACCORDION_JS, month_el, self._ACCORDION_ANCESTOR_DEPTH, False)
                 logger.info(f"Before click: {before_state}")
+                logger.success(f"Clicked month header: {month_name}")
+                self._wait_for_collapse_settled(timeout=3)
                 
-                # Try MULTIPLE click strategies to ensure accordion opens
-                self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", month_el)
-                time.sleep(0.5)
-                
-                # Strategy 1: JS click
-                self.driver.execute_script("arguments[0].click();", month_el)
-                time.sleep(1.0)
-                
-                # Strategy 2: If not opened, try regular click
-                try:
-                    month_el.click()
-                except:
-                    pass
-                time.sleep(1.0)
-                
-                # Strategy 3: Try clicking parent if it's a link/button wrapper
-                try:
-                    parent = month_el.find_element(By.XPATH, "..")
-                    self.driver.execute_script("arguments[0].click();", parent)
-                except:
-                    pass
-                
-                logger.success(f"Clicked month header: {month_el.text.strip() if month_el.text else month_name}")
-                
-                # Wait for animation
-                time.sleep(2.0)
-                
-                # Force the panel to open with JavaScript if click didn't work
-                force_open_result = self.driver.execute_script("""
-                    var el = arguments[0];
-                    var maxDepth = arguments[1];
-                    // Traverse up to find the actual accordion toggle with data-bs-target, data-target or href
-                    var toggleEl = el;
-                    var target = null;
-                    for (var i = 0; i < maxDepth && toggleEl; i++) {
-                        target = toggleEl.getAttribute('data-bs-target') || toggleEl.getAttribute('data-target') || toggleEl.getAttribute('href');
-                        if (target) break;
-                        toggleEl = toggleEl.parentElement;
-                    }
-                    var panel = target ? document.querySelector(target) : null;
-                    
-                    if (!panel) {
-                        return {success: false, error: 'No target panel found'};
-                    }
-                    
-                    var wasVisible = panel.classList.contains('show');
-                    
-                    // Force open the panel
-                    if (!wasVisible) {
-                        panel.classList.add('show', 'in');
-                        panel.style.display = 'block';
-                        if (toggleEl) {
-                            toggleEl.setAttribute('aria-expanded', 'true');
-                            toggleEl.classList.remove('collapsed');
-                        }
-                    }
-                    
-                    var panelInputs = panel.querySelectorAll('input.calendar-prayer-time').length;
-                    
-                    return {
-                        success: true,
-                        wasVisible: wasVisible,
-                        nowVisible: panel.classList.contains('show'),
-                        panelInputs: panelInputs,
-                        target: target
-                    };
-                """, month_el, self._ACCORDION_ANCESTOR_DEPTH)
+                force_open_result = self.driver.execute_script(
+                    _OPEN_ACCORDION_JS, month_el, self._ACCORDION_ANCESTOR_DEPTH, True)
                 logger.info(f"Force open result: {force_open_result}")
                 
                 if force_open_result.get('success') and force_open_result.get('nowVisible'):
@@ -1556,13 +2137,8 @@ class MawaqitUploader:
             
             # Read the CSV file
             logger.info(f"📖 Reading CSV file: {athan_filepath}")
-            import csv
-            csv_data = []
             try:
-                with open(athan_filepath, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        csv_data.append(row)
+                csv_columns, csv_data = self._read_prayer_csv(athan_filepath)
                 logger.success(f"✅ Loaded {len(csv_data)} rows from CSV")
                 logger.info(f"Sample row: {csv_data[0] if csv_data else 'empty'}")
             except Exception as e:
@@ -1572,17 +2148,12 @@ class MawaqitUploader:
             # Find all calendar input fields in the expanded month WITHIN Athan section
             logger.info("🔍 Finding Athan calendar input fields...")
             try:
-                # Wait a bit more for panel to be ready
-                time.sleep(2)
+                # Wait for the panel's open animation to finish
+                self._wait_for_collapse_settled()
                 
                 # CRITICAL: Get inputs from the expanded month panel using the month_el we just clicked
-                # Resolve the accordion toggle to get its data-target or href panel reference
-                toggle_el = self._resolve_accordion_toggle(month_el)
-                panel_id = (
-                    toggle_el.get_attribute('data-bs-target') or
-                    toggle_el.get_attribute('data-target') or
-                    toggle_el.get_attribute('href')
-                ) if toggle_el else None
+                # (its data-target or href panel reference was read when the toggle was resolved)
+                panel_id = month_target
                 logger.info(f"📍 Athan panel ID: {panel_id}")
                 
                 if panel_id and panel_id.startswith('#'):
@@ -1596,13 +2167,7 @@ class MawaqitUploader:
                     logger.info(f"Found {len(inputs)} total calendar-prayer-time inputs")
                 
                 # Filter to only visible inputs (in the expanded panel)
-                visible_inputs = []
-                for inp in inputs:
-                    try:
-                        if inp.is_displayed():
-                            visible_inputs.append(inp)
-                    except:
-                        pass
+                visible_inputs = self._filter_visible(inputs)
                 
                 logger.info(f"Found {len(visible_inputs)} VISIBLE Athan calendar inputs")
                 
@@ -1626,14 +2191,8 @@ class MawaqitUploader:
                                 }
                             }
                         """)
-                        time.sleep(1.0)
-                        visible_inputs = []
-                        for inp in inputs:
-                            try:
-                                if inp.is_displayed():
-                                    visible_inputs.append(inp)
-                            except:
-                                pass
+                        # The classes/styles are applied synchronously; no settle time needed
+                        visible_inputs = self._filter_visible(inputs)
                         logger.info(f"After JS force-show: found {len(visible_inputs)} VISIBLE Athan calendar inputs")
                     except Exception as e:
                         logger.error(f"JS force-show fallback failed: {e}")
@@ -1643,7 +2202,7 @@ class MawaqitUploader:
                     return False
                 
                 # First, log the CSV structure to verify
-                logger.info(f"📊 CSV structure - First row keys: {list(csv_data[0].keys()) if csv_data else 'empty'}")
+                logger.info(f"📊 CSV structure - Columns: {list(csv_columns) if csv_data else 'empty'}")
                 logger.info(f"📊 First 3 days of data:")
                 for i in range(min(3, len(csv_data))):
                     logger.info(f"  Day {i+1}: {csv_data[i]}")
@@ -1656,9 +2215,9 @@ class MawaqitUploader:
                 # But some calendars may have only 5 (no Sunrise)
                 if inputs_per_day == 5:
                     logger.warning("⚠️ Only 5 inputs per day detected - skipping Sunrise")
-                    prayer_names = ['Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha']
+                    prayer_names = self._ATHAN_PRAYERS_NO_SUNRISE
                 else:
-                    prayer_names = ['Fajr', 'Sunrise', 'Dhuhr', 'Asr', 'Maghrib', 'Isha']
+                    prayer_names = self._ATHAN_PRAYERS
                 
                 logger.info(f"📋 Using prayer mapping: {prayer_names}")
                 
@@ -1666,8 +2225,12 @@ class MawaqitUploader:
                 logger.info("✍️ Entering prayer times into each field...")
                 populated = 0
                 
+                # Resolve header positions once instead of a dict lookup per cell
+                day_col = csv_columns.get('Day')
+                prayer_cols = [csv_columns.get(name) for name in prayer_names]
+                
                 for day_idx, row in enumerate(csv_data):
-                    day_number = row.get('Day', day_idx + 1)
+                    day_number = row[day_col] if day_col is not None and day_col < len(row) else day_idx + 1
                     
                     for prayer_idx, prayer_name in enumerate(prayer_names):
                         input_index = (day_idx * inputs_per_day) + prayer_idx
@@ -1675,7 +2238,8 @@ class MawaqitUploader:
                         if input_index >= len(visible_inputs):
                             break
                         
-                        time_value = row.get(prayer_name, '')
+                        col = prayer_cols[prayer_idx]
+                        time_value = row[col] if col is not None and col < len(row) else ''
                         if time_value:
                             try:
                                 inp = visible_inputs[input_index]
@@ -1732,7 +2296,6 @@ class MawaqitUploader:
                         }
                     """, month_el, self._ACCORDION_ANCESTOR_DEPTH)
                     logger.success("✅ Closed Athan month accordion")
-                    time.sleep(0.5)
                     
                     # DON'T close the "Calculation" section - it will collapse Iqama too!
                     # Just closing the month accordion is enough
@@ -2447,47 +3010,24 @@ class MawaqitUploader:
             except Exception as e:
                 logger.warning(f"Could not force-close Athan accordions: {e}")
             
-            time.sleep(1.0)
-            
             # Scroll down significantly to ensure Iqama section is in view
             logger.info("Scrolling down to find Iqama section...")
             self.driver.execute_script("window.scrollBy(0, 800);")
-            time.sleep(1.5)
             
             # Step 1: Find and click "Iqama" section
             logger.info("Looking for 'Iqama' section...")
-            iqama_section = None
-            
-            iqama_selectors = [
-                "//*[contains(text(), 'Iqama') or contains(text(), 'iqama')]",
-                "//div[contains(., 'Iqama')]",
-                "//h3[contains(., 'Iqama')]",
-                "//h4[contains(., 'Iqama')]",
-                "//*[contains(@class, 'panel') and contains(., 'Iqama')]",
-                "//*[contains(@class, 'accordion') and contains(., 'Iqama')]"
-            ]
-            
-            for sel in iqama_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, sel)
-                    for el in elements:
-                        if el.is_displayed():
-                            txt = (el.text or "").strip()
-                            if txt and len(txt) < 20:  # Iqama header should be short
-                                iqama_section = el
-                                logger.debug(f"Found Iqama section: '{txt}'")
-                                break
-                    if iqama_section:
-                        break
-                except Exception:
-                    continue
+            # Iqama header text should be short (< 20 chars)
+            iqama_section, sel = self._first_visible_by_xpath(
+                self._IQAMA_SECTION_XPATHS, max_text_len=20, cache_key="iqama_section")
+            if iqama_section:
+                logger.debug(f"Found Iqama section with selector: {sel}")
             
             if not iqama_section:
                 logger.error("Could not find 'Iqama' section after trying all selectors")
                 logger.info("Dumping visible page text for debugging...")
                 try:
-                    body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                    logger.debug(f"Page contains: {body_text[:500]}...")
+                    body_text = self._visible_text_head(500)
+                    logger.debug(f"Page contains: {body_text}...")
                 except Exception:
                     pass
                 self._save_debug_screenshot("iqama_section_not_found")
@@ -2497,40 +3037,20 @@ class MawaqitUploader:
             # Click to expand Iqama section
             logger.info("Clicking 'Iqama' section to expand it...")
             try:
-                self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", iqama_section)
-                time.sleep(0.3)
-                self.driver.execute_script("arguments[0].click();", iqama_section)
+                self._scroll_and_click(iqama_section)
                 logger.success("Clicked 'Iqama' section")
             except Exception as e:
                 logger.error(f"Failed to click Iqama section: {e}")
                 self._save_debug_screenshot("iqama_click_failed")
                 return False
             
-            time.sleep(1.0)
+            self._wait_for_collapse_settled()
             
             # Step 2: Click "By calendar" tab
             logger.info("Looking for 'By calendar' tab...")
-            calendar_tab = None
-            
-            calendar_selectors = [
-                "//a[normalize-space(.)='By calendar']",
-                "//button[normalize-space(.)='By calendar']",
-                "//*[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'calendar')]",
-                "//*[contains(@class, 'nav-link') and contains(., 'calendar')]"
-            ]
-            
-            for sel in calendar_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, sel)
-                    for el in elements:
-                        if el.is_displayed():
-                            calendar_tab = el
-                            logger.debug(f"Found By calendar tab: '{el.text}'")
-                            break
-                    if calendar_tab:
-                        break
-                except Exception:
-                    continue
+            calendar_tab, sel = self._first_visible_by_xpath(self._CALENDAR_TAB_XPATHS, cache_key="calendar_tab")
+            if calendar_tab:
+                logger.debug(f"Found By calendar tab with selector: {sel}")
             
             if not calendar_tab:
                 # Do not fail here; some layouts may show the calendar by default
@@ -2540,7 +3060,6 @@ class MawaqitUploader:
                 logger.info("Clicking 'By calendar' tab...")
                 try:
                     self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", calendar_tab)
-                    time.sleep(0.3)
                     calendar_tab.click()
                     logger.success("Clicked 'By calendar' tab")
                 except Exception as e:
@@ -2552,7 +3071,12 @@ class MawaqitUploader:
                         logger.warning(f"Failed to click By calendar (continuing): {e2}")
                         self._save_debug_screenshot("calendar_tab_click_failed")
             
-            time.sleep(2.0)  # Wait longer for tab content to load
+            # Wait for the tab content (calendar inputs) to load
+            try:
+                WebDriverWait(self.driver, 5).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "input.calendar-prayer-time")))
+            except TimeoutException:
+                logger.debug("No calendar inputs yet after By calendar tab")
             
             # Step 3: Check if Iqama uses month accordions or if calendar is always visible
             # IMPORTANT: Iqama structure might be DIFFERENT from Athan!
@@ -2563,7 +3087,7 @@ class MawaqitUploader:
             skip_month_search = False
             try:
                 test_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input.calendar-prayer-time")
-                visible_count = sum(1 for inp in test_inputs if inp.is_displayed())
+                visible_count = len(self._filter_visible(test_inputs))
                 logger.info(f"Found {visible_count} visible calendar inputs before month click")
                 
                 if visible_count >= 150:  # Iqama should have ~150-180 inputs
@@ -2578,35 +3102,33 @@ class MawaqitUploader:
             if skip_month_search:
                 logger.info("Skipping month search - inputs already visible!")
             else:
-                labels = self._possible_month_labels(month_name)
+                label_xpaths = self._possible_month_labels(month_name)
+                labels = [label for label, _ in label_xpaths]
                 logger.info(f"Looking for month '{month_name}' in Iqama calendar (trying: {labels})...")
                 
                 # Get ALL month elements on the page (more permissive search)
                 all_months = []
-                for label in labels:
-                    lower = label.lower()
-                    # Search for ANY element containing the month name
-                    xpath_contains = f"//*[contains(translate(normalize-space(.),'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), '{lower}')]"
+                for label, xpath_contains in label_xpaths:
                     try:
                         candidates = self.driver.find_elements(By.XPATH, xpath_contains)
-                        logger.debug(f"Found {len(candidates)} candidates for '{label}'")
+                        logger.debug("Found {} candidates for '{}'", len(candidates), label)
                         
-                        for el in candidates:
+                        for el in self._filter_visible(candidates):
                             try:
-                                if el.is_displayed():
-                                    txt = (el.text or "").strip()
-                                    # Month names should be short
-                                    if txt and len(txt) < 30 and len(txt) > 2:
-                                        tag = el.tag_name
-                                        # Only add clickable elements (a, button, etc.)
-                                        if tag in ['a', 'button', 'div', 'h4', 'h5']:
-                                            all_months.append(el)
-                                            logger.debug(f"  Added: <{tag}> '{txt}' at Y={el.location['y']}")
+                                txt = (el.text or "").strip()
+                                # Month names should be short
+                                if txt and len(txt) < 30 and len(txt) > 2:
+                                    tag = el.tag_name
+                                    # Only add clickable elements (a, button, etc.)
+                                    if tag in ['a', 'button', 'div', 'h4', 'h5']:
+                                        all_months.append(el)
+                                        logger.opt(lazy=True).debug("  Added: <{}> '{}' at Y={}", lambda: tag, lambda: txt,
+                                                                    lambda: el.location['y'])
                             except Exception as e:
-                                logger.debug(f"  Skipped element: {e}")
+                                logger.debug("  Skipped element: {}", e)
                                 continue
                     except Exception as e:
-                        logger.debug(f"XPath search for label '{label}' failed: {e}")
+                        logger.debug("XPath search for label '{}' failed: {}", label, e)
                         continue
                 
                 logger.info(f"Found {len(all_months)} total month elements matching '{month_name}'")
@@ -2624,14 +3146,15 @@ class MawaqitUploader:
                 for el in all_months:
                     try:
                         el_y = el.location['y']
-                        logger.debug(f"Checking month at Y={el_y}, text='{el.text.strip()}'")
+                        logger.opt(lazy=True).debug("Checking month at Y={}, text='{}'", lambda: el_y,
+                                                    lambda: el.text.strip())
                         
                         if el_y > iqama_y_position:
                             month_el = el
                             logger.success(f"✅ Selected Iqama month '{el.text.strip()}' at Y={el_y} (below Iqama header at Y={iqama_y_position})")
                             break
                     except Exception as e:
-                        logger.debug(f"Error checking month position: {e}")
+                        logger.debug("Error checking month position: {}", e)
                         continue
                 
                 # Handle month accordion if needed  
@@ -2642,11 +3165,11 @@ class MawaqitUploader:
             
             if month_el:
                 # Traverse up to find the actual accordion toggle with data-target or href
-                actual_toggle = self._resolve_accordion_toggle(month_el)
+                actual_toggle, month_target = self._resolve_accordion_toggle(month_el)
                 if actual_toggle:
                     month_el = actual_toggle
-                    logger.debug(f"Resolved Iqama accordion toggle: tag={month_el.tag_name}, "
-                                 f"target={month_el.get_attribute('data-target') or month_el.get_attribute('href')}")
+                    logger.opt(lazy=True).debug(
+                        "Resolved Iqama accordion toggle: tag={}, target={}", lambda: month_el.tag_name, lambda: month_target)
                 else:
                     logger.warning("Could not find Iqama accordion toggle ancestor; proceeding with original element")
 
@@ -2658,77 +3181,17 @@ class MawaqitUploader:
                 
                 logger.info(f"Clicking month '{month_name}' in Iqama...")
                 try:
-                    self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", month_el)
-                    time.sleep(0.5)
-                    
-                    # Try multiple click strategies
-                    self.driver.execute_script("arguments[0].click();", month_el)
-                    time.sleep(1.0)
-                    
-                    try:
-                        month_el.click()
-                    except:
-                        pass
-                    time.sleep(1.0)
-                    
-                    logger.success(f"Clicked month: {month_el.text.strip()}")
+                    click_state = self.driver.execute_script(
+                        _OPEN_ACCORDION_JS, month_el, self._ACCORDION_ANCESTOR_DEPTH, False)
+                    logger.success(f"Clicked month: {month_name} ({click_state})")
                 except Exception as e:
                     logger.warning(f"Failed to click month (continuing): {e}")
                     self._save_debug_screenshot("iqama_month_click_failed")
                 
-                # Wait and force open if needed
-                time.sleep(2.0)
-                
-                # Force the Iqama panel to open with JavaScript
-                force_open_result = self.driver.execute_script("""
-                    var el = arguments[0];
-                    var maxDepth = arguments[1];
-                    // Traverse up to find the accordion toggle with data-target or href
-                    var toggleEl = el;
-                    var target = null;
-                    for (var i = 0; i < maxDepth && toggleEl; i++) {
-                        target = toggleEl.getAttribute('data-target') || toggleEl.getAttribute('href');
-                        if (target) break;
-                        toggleEl = toggleEl.parentElement;
-                    }
-                    var panel = null;
-                    
-                    if (target) {
-                        // Handle IDs that start with digits - use getElementById instead
-                        if (target.startsWith('#')) {
-                            var id = target.substring(1);
-                            panel = document.getElementById(id);
-                        } else {
-                            panel = document.querySelector(target);
-                        }
-                    }
-                    
-                    if (!panel) {
-                        return {success: false, error: 'No target panel found', target: target};
-                    }
-                    
-                    var wasVisible = panel.classList.contains('show');
-                    
-                    // Force open the panel
-                    if (!wasVisible) {
-                        panel.classList.add('show', 'in');
-                        panel.style.display = 'block';
-                        if (toggleEl) {
-                            toggleEl.setAttribute('aria-expanded', 'true');
-                            toggleEl.classList.remove('collapsed');
-                        }
-                    }
-                    
-                    var panelInputs = panel.querySelectorAll('input.calendar-prayer-time').length;
-                    
-                    return {
-                        success: true,
-                        wasVisible: wasVisible,
-                        nowVisible: panel.classList.contains('show'),
-                        panelInputs: panelInputs,
-                        target: target
-                    };
-                """, month_el, self._ACCORDION_ANCESTOR_DEPTH)
+                # Let the collapse animation finish, then force open if needed
+                self._wait_for_collapse_settled(timeout=3)
+                force_open_result = self.driver.execute_script(
+                    _OPEN_ACCORDION_JS, month_el, self._ACCORDION_ANCESTOR_DEPTH, True)
                 logger.info(f"Iqama force open result: {force_open_result}")
                 
                 if force_open_result.get('success'):
@@ -2738,12 +3201,15 @@ class MawaqitUploader:
             else:
                 logger.info("ℹ️  Skipping month accordion (inputs already visible)")
             
-            # Wait longer for panel animation to complete
-            logger.info("⏳ Waiting briefly before deterministic fill...")
-            time.sleep(1.5)
-            
-            # Debug: Take screenshot after clicking Iqama month
-            self._save_debug_screenshot("after_iqama_month_click")
+            # Wait for the iqama inputs to be in the DOM before the deterministic fill
+            logger.info("⏳ Waiting for Iqama inputs before deterministic fill...")
+            try:
+                WebDriverWait(self.driver, 5).until(EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, "input[name^='configuration[iqamaCalendar]']")))
+            except TimeoutException:
+                logger.debug("Iqama inputs not present yet; the fill will scroll for them")
+                # Debug: Take screenshot after clicking Iqama month
+                self._save_debug_screenshot("after_iqama_month_click")
 
             # METHOD 2: MANUAL ENTRY for Iqama (same as Athan)
             logger.info("="*60)
@@ -2752,13 +3218,8 @@ class MawaqitUploader:
             
             # Read the Iqama CSV file
             logger.info(f"📖 Reading Iqama CSV file: {iqama_filepath}")
-            import csv
-            csv_data = []
             try:
-                with open(iqama_filepath, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        csv_data.append(row)
+                csv_columns, csv_data = self._read_prayer_csv(iqama_filepath)
                 logger.success(f"✅ Loaded {len(csv_data)} rows from Iqama CSV")
                 logger.info(f"Sample row: {csv_data[0] if csv_data else 'empty'}")
             except Exception as e:
@@ -2768,76 +3229,23 @@ class MawaqitUploader:
             # Deterministic: fill Iqama by name attribute, 5 prayers only (no Sunrise)
             logger.info("🔍 Filling Iqama times via deterministic name selectors (no month/panel assumptions)...")
             try:
-                # Month index mapping (0-based as observed on the site: November -> 10)
-                month_map = {
-                    'january': 0, 'janvier': 0,
-                    'february': 1, 'février': 1, 'fevrier': 1,
-                    'march': 2, 'mars': 2,
-                    'april': 3, 'avril': 3,
-                    'may': 4, 'mai': 4,
-                    'june': 5, 'juin': 5,
-                    'july': 6, 'juillet': 6,
-                    'august': 7, 'août': 7, 'aout': 7,
-                    'september': 8, 'septembre': 8,
-                    'october': 9, 'octobre': 9,
-                    'november': 10, 'novembre': 10,
-                    'december': 11, 'décembre': 11, 'decembre': 11
-                }
+                # Month index (0-based as observed on the site: November -> 10)
                 m_key = (month_name or "").strip().lower()
-                m_idx = month_map.get(m_key)
+                m_idx = _MONTH_INDEX.get(m_key)
                 if m_idx is None:
                     logger.error(f"❌ Could not map month '{month_name}' to index")
                     return False
 
-                # Slot mapping: strictly 5 prayers (no Sunrise)
-                # 1: Fajr, 2: Dhuhr, 3: Asr, 4: Maghrib, 5: Isha
-                prayer_to_slot = {
-                    'Fajr': 1,
-                    'Dhuhr': 2,
-                    'Asr': 3,
-                    'Maghrib': 4,
-                    'Isha': 5,
-                }
-
-                def _normalize_time(val:str) -> str:
-                    v = (val or '').strip()
-                    if not v:
-                        return v
-                    # Accept HH:mm or H:m and normalize to HH:mm
-                    parts = v.replace('.', ':').replace(' ', '').split(':')
-                    if len(parts) == 2 and all(p.isdigit() for p in parts):
-                        h, m = parts
-                        try:
-                            h_i, m_i = int(h), int(m)
-                            if 0 <= h_i <= 23 and 0 <= m_i <= 59:
-                                return f"{h_i:02d}:{m_i:02d}"
-                        except Exception:
-                            pass
-                    return v
-
                 def _try_selectors(day:int, slot:int, month_index:int):
-                    # Build multiple selector variants to tolerate off-by-one indexing differences
-                    selectors = [
-                        f"input[name='configuration[iqamaCalendar][{month_index}][{day}][{slot}]']",
-                    ]
-                    if slot > 0:
-                        selectors.append(f"input[name='configuration[iqamaCalendar][{month_index}][{day}][{slot-1}]']")
-                    selectors.append(f"input[name='configuration[iqamaCalendar][{month_index+1}][{day}][{slot}]']")
-                    if slot > 0:
-                        selectors.append(f"input[name='configuration[iqamaCalendar][{month_index+1}][{day}][{slot-1}]']")
-                    for sel in selectors:
-                        try:
-                            els = self.driver.find_elements(By.CSS_SELECTOR, sel)
-                            if els:
-                                return els[0]
-                            # JS querySelector fallback after small scroll
-                            self.driver.execute_script("window.scrollBy(0, 200);")
-                            el = self.driver.execute_script("return document.querySelector(arguments[0]);", sel)
-                            if el:
-                                return el
-                        except Exception:
-                            continue
-                    return None
+                    # Each selector is evaluated once, first match wins; a miss is simply None
+                    # rather than a find_elements probe followed by a second querySelector
+                    try:
+                        found = self.driver.execute_script(
+                            _FIRST_MATCH_PER_GROUP_JS, [list(_iqama_input_selectors(month_index, day, slot))]
+                        )
+                        return found[0] if found else None
+                    except Exception:
+                        return None
 
                 populated, missing = 0, 0
                 # Progressive scroll anchors to help lazy DOMs
@@ -2848,19 +3256,33 @@ class MawaqitUploader:
                         if el:
                             return el
                         self.driver.execute_script("window.scrollBy(0, 600);")
-                        time.sleep(0.05)
                     # Try from top as a last resort
                     self.driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(0.05)
                     return _try_selectors(day, slot, m_idx)
 
+                # Header positions per slot, resolved once for the whole month
+                slot_cols = [(prayer, slot, csv_columns.get(prayer)) for prayer, slot in self._IQAMA_PRAYER_SLOTS]
+
+                # Look up every cell's input in one script call; the scroll-and-retry path
+                # above only runs for cells that are not in the DOM yet
+                cells = [(day, slot) for day in range(1, len(csv_data) + 1) for _, slot, _ in slot_cols]
+                try:
+                    found = self.driver.execute_script(
+                        _FIRST_MATCH_PER_GROUP_JS,
+                        [list(_iqama_input_selectors(m_idx, day, slot)) for day, slot in cells])
+                    resolved = {cell: el for cell, el in zip(cells, found) if el is not None}
+                    logger.debug(f"Resolved {len(resolved)}/{len(cells)} Iqama inputs in one lookup")
+                except Exception as e:
+                    logger.debug(f"Batch Iqama input lookup failed: {e}")
+                    resolved = {}
+
                 for day_idx, row in enumerate(csv_data, start=1):
-                    for prayer, slot in prayer_to_slot.items():
-                        time_value = _normalize_time(row.get(prayer))
+                    for prayer, slot, col in slot_cols:
+                        time_value = _normalize_time(row[col] if col is not None and col < len(row) else '')
                         if not time_value:
                             # Skip silently if CSV value missing (shouldn't happen per user's guarantee)
                             continue
-                        inp = _progressive_scroll_attempt(day_idx, slot)
+                        inp = resolved.get((day_idx, slot)) or _progressive_scroll_attempt(day_idx, slot)
                         if not inp:
                             missing += 1
                             if missing <= 5:
@@ -2870,7 +3292,6 @@ class MawaqitUploader:
                             # Scroll into view then clear & type
                             try:
                                 self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", inp)
-                                time.sleep(0.05)
                             except Exception:
                                 pass
                             try:
@@ -3045,31 +3466,20 @@ class MawaqitUploader:
     def _click_save_button(self):
         """Scroll to bottom and click the Save button. Returns True on success."""
         try:
-            logger.info("Scrolling to bottom to find Save button...")
-            
-            # Scroll to bottom
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1.0)
+            logger.info("Looking for Save button...")
             
-            # Find Save button
-            save_selectors = [
-                "//button[normalize-space(.)='Save']",
-                "//*[contains(@class, 'btn-primary') and contains(., 'Save')]"
-            ]
-            
-            save_btn = None
-            for sel in save_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, sel)
-                    for el in elements:
-                        if el.is_displayed():
-                            save_btn = el
-                            logger.debug(f"Found Save button: '{el.text}'")
-                            break
-                    if save_btn:
-                        break
-                except Exception:
-                    continue
+            # Find Save button; visibility is judged by layout, not viewport, so there is no
+            # need to scroll to the bottom first. Poll briefly in case it renders late.
+            def find_save(_driver):
+                found = self._first_visible_by_xpath(self._SAVE_BUTTON_XPATHS, cache_key="save_button")
+                return found if found[0] is not None else False
+
+            try:
+                save_btn, sel = WebDriverWait(self.driver, 5).until(find_save)
+            except TimeoutException:
+                save_btn, sel = None, None
+            if save_btn:
+                logger.debug(f"Found Save button with selector: {sel}")
             
             if not save_btn:
                 logger.error("Could not find Save button")
@@ -3079,7 +3489,6 @@ class MawaqitUploader:
             logger.info("Clicking Save button...")
             try:
                 self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", save_btn)
-                time.sleep(0.5)
                 save_btn.click()
                 logger.success("✅ Clicked Save button")
             except Exception as e:
@@ -3092,8 +3501,16 @@ class MawaqitUploader:
                     self._save_debug_screenshot("save_click_failed")
                     return False
             
-            # Wait for save to complete
-            time.sleep(2.0)
+            # Wait for save to complete: the form submit replaces the page, or a success
+            # notice is shown in place; proceed as soon as either happens
+            try:
+                WebDriverWait(self.driver, 10).until(EC.any_of(
+                    EC.staleness_of(save_btn),
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, self._SAVE_SUCCESS_CSS)),
+                ))
+                self._wait_for_document_ready(timeout=10)
+            except TimeoutException:
+                logger.warning("No page reload or success notice seen after Save")
             logger.success("Save completed successfully")
             return True
             
@@ -3102,103 +3519,216 @@ class MawaqitUploader:
             self._save_debug_screenshot("save_button_error")
             return False
 
-    def run(self):
-        """Execute the upload process."""
+    def _restore_cookies(self, url):
+        """Load saved session cookies into the browser for *url*'s site. Returns True if any were set."""
+        # A persistent profile already carries its cookies, and a reused browser has live ones
+        if not Config.COOKIE_FILE or Config.CHROME_PROFILE_DIR or self.driver.get_cookies():
+            return False
         try:
-            login_url = Config.LOGIN_URL
-            logger.info("Opening Mawaqit backoffice login page...")
-            self.driver.get(login_url)
-
-            wait_secs = getattr(Config, "WAIT_BETWEEN_ACTIONS", 3)
-            
-            # Define selectors
-            email_selectors = [
-                (By.NAME, "email"),
-                (By.CSS_SELECTOR, "input[type='email']"),
-                (By.ID, "email"),
-                (By.NAME, "username"),
-                (By.CSS_SELECTOR, "input[name='username']")
-            ]
-            password_selectors = [
-                (By.NAME, "password"),
-                (By.CSS_SELECTOR, "input[type='password']"),
-                (By.ID, "password")
-            ]
-            submit_selectors = [
-                (By.CSS_SELECTOR, "button[type='submit']"),
-                (By.XPATH, "//button[contains(., 'Login') or contains(., 'Sign in') or contains(., 'Log in')]")
-            ]
-
-            # Fill email
-            email_el = self._find_element_with_selectors(email_selectors, timeout=20)
-            logger.info("Entering email...")
-            self._type_visible(email_el, Config.MAWAQIT_USER, char_delay=0.1)
-
-            time.sleep(wait_secs / 2)
+            # A stale session would only cost a robots.txt load and a redirect back to the form
+            age = time.time() - os.stat(Config.COOKIE_FILE).st_mtime
+            if age > Config.COOKIE_MAX_AGE_HOURS * 3600:
+                logger.debug(f"Saved cookies are {age / 3600:.1f}h old; not restoring")
+                return False
+            with open(Config.COOKIE_FILE, "r") as f:
+                cookies = json.load(f)
+        except Exception:
+            return False
+        # Expired cookies would be dropped by the browser anyway; skip their add_cookie round-trips
+        now = time.time()
+        cookies = [c for c in cookies or () if not c.get("expiry") or c["expiry"] > now]
+        if not cookies:
+            return False
+        # Cookies can only be set for the domain currently loaded; robots.txt is the cheapest page
+        parsed = urllib.parse.urlparse(url)
+        self.driver.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+        restored = 0
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+                restored += 1
+            except Exception as e:
+                logger.debug("Skipping saved cookie {}: {}", cookie.get('name'), e)
+        logger.info(f"Restored {restored} saved session cookies")
+        return restored > 0
+
+    def _save_cookies(self):
+        """Persist the logged-in session cookies so the next run can skip login, reCAPTCHA and 2FA."""
+        if not Config.COOKIE_FILE:
+            return
+        try:
+            os.makedirs(os.path.dirname(Config.COOKIE_FILE), exist_ok=True)
+            # Session credentials: keep the file private to the current user
+            fd = os.open(Config.COOKIE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.driver.get_cookies(), f)
+        except Exception as e:
+            logger.debug(f"Could not persist session cookies: {e}")
 
-            # Fill password
-            pwd_el = self._find_element_with_selectors(password_selectors, timeout=20)
-            logger.info("Entering password...")
-            self._type_visible(pwd_el, Config.MAWAQIT_PASS, char_delay=0.1)
+    def _login(self):
+        """Fill and submit the login form (solving reCAPTCHA and 2FA if shown).
+        Expects the login page to be loaded already."""
+        wait_secs = getattr(Config, "WAIT_BETWEEN_ACTIONS", 3)
+        
+        # Fill email
+        email_el = self._find_element_with_selectors(self._LOGIN_EMAIL_SELECTORS, timeout=20)
+        logger.info("Entering email...")
+        self._type_visible(email_el, Config.MAWAQIT_USER, char_delay=0.1)
+
+        # Fill password
+        pwd_el = self._find_element_with_selectors(self._LOGIN_PASSWORD_SELECTORS, timeout=20)
+        logger.info("Entering password...")
+        self._type_visible(pwd_el, Config.MAWAQIT_PASS, char_delay=0.1)
+
+        # The page was returned at DOMContentLoaded; let scripts finish, and if a
+        # reCAPTCHA container is present give its iframe a moment to be injected
+        self._wait_for_document_ready(timeout=wait_secs * 3)
+        probe = self._probe_recaptcha()
+        recaptcha_iframe = probe.get("iframe")
+        if probe.get("container") and not recaptcha_iframe:
+            try:
+                recaptcha_iframe = WebDriverWait(self.driver, wait_secs * 3).until(
+                    lambda d: self._detect_recaptcha_iframe())
+            except TimeoutException:
+                logger.debug("reCAPTCHA container present but iframe not injected yet")
+        if probe.get("sitekey"):
+            # Already read in the same round-trip; _extract_sitekey will hit the cache
+            parsed = urllib.parse.urlparse(self.driver.current_url)
+            self._sitekey_cache.setdefault(parsed.netloc + parsed.path, probe["sitekey"])
+
+        # Handle reCAPTCHA before form submission
+        if recaptcha_iframe:
+            logger.info("reCAPTCHA detected - starting solve sequence...")
+        
+            # Click the checkbox
+            clicked = self._click_recaptcha_checkbox(recaptcha_iframe, timeout=15)
+            if not clicked:
+                logger.error("Could not click reCAPTCHA checkbox.")
+                return False
 
-            time.sleep(wait_secs / 2)
+            # Solving is paid and slow; make sure there is something to upload first.
+            # The background download has usually finished by now.
+            if not self._prefetch_month_csvs(self._get_month_name()).result():
+                logger.error("Could not download required CSVs; not solving the captcha.")
+                return False
 
-            # Handle reCAPTCHA before form submission
-            recaptcha_iframe = self._detect_recaptcha_iframe()
-            if recaptcha_iframe:
-                logger.info("reCAPTCHA detected - starting solve sequence...")
-                
-                # Click the checkbox
-                clicked = self._click_recaptcha_checkbox(recaptcha_iframe, timeout=15)
-                if not clicked:
-                    logger.error("Could not click reCAPTCHA checkbox.")
-                    return False
+            # Submit to 2Captcha and get solution
+            sitekey = self._extract_sitekey()
+            if not sitekey:
+                logger.error("Could not extract reCAPTCHA sitekey.")
+                return False
 
-                # Submit to 2Captcha and get solution
-                sitekey = self._extract_sitekey()
-                if not sitekey:
-                    logger.error("Could not extract reCAPTCHA sitekey.")
-                    return False
+            logger.info("Submitting to 2Captcha for solution...")
+            token = self._submit_2captcha(sitekey, self.driver.current_url)
+            if not token:
+                logger.error("Failed to get solution from 2Captcha.")
+                return False
 
-                logger.info("Submitting to 2Captcha for solution...")
-                token = self._submit_2captcha(sitekey, self.driver.current_url)
-                if not token:
-                    logger.error("Failed to get solution from 2Captcha.")
-                    return False
+            # Inject the token
+            if not self._inject_recaptcha_token(token):
+                logger.error("Failed to inject solved token.")
+                return False
 
-                # Inject the token
-                if not self._inject_recaptcha_token(token):
-                    logger.error("Failed to inject solved token.")
-                    return False
+            logger.success("Successfully obtained and injected captcha solution.")
 
-                logger.success("Successfully obtained and injected captcha solution.")
+        # Submit the login form
+        submit_el = self._find_element_with_selectors(self._LOGIN_SUBMIT_SELECTORS, timeout=15)
+        logger.info("Submitting login form with solved captcha...")
+        # Any solved token is consumed by this submit, whatever the outcome
+        _RECAPTCHA_CACHE["token"] = None
+        # The 2FA mail is sent from this point on; the waits below can take up to a minute
+        submitted_at = datetime.now(timezone.utc)
+        try:
+            submit_el.click()
+        except Exception:
+            pwd_el.send_keys("\n")
 
-            # Submit the login form
-            submit_el = self._find_element_with_selectors(submit_selectors, timeout=15)
-            logger.info("Submitting login form with solved captcha...")
-            try:
-                submit_el.click()
-            except Exception:
-                pwd_el.send_keys("\n")
+        # Wait for either 2FA page or landing. The login URL itself contains "/en",
+        # so first wait for the browser to actually leave it.
+        logger.info("Waiting for login response...")
+        try:
+            WebDriverWait(self.driver, 30).until(lambda d: "/login" not in (d.current_url or ""))
+            left_login = True
+        except TimeoutException:
+            left_login = False
+        if not left_login or not self._wait_for_url_change(["/security/2fa", "/en"], timeout=30):
+            logger.error("Login form submission failed")
+            # The sitekey may have been rotated; re-detect it on the next attempt
+            self._sitekey_cache.clear()
+            return False
 
-            # Wait for either 2FA page or landing
-            logger.info("Waiting for login response...")
-            if not self._wait_for_url_change(["/security/2fa", "/en"], timeout=30):
-                logger.error("Login form submission failed")
+        # Check if we're on 2FA page
+        if "/security/2fa" in self.driver.current_url:
+            logger.info("Detected 2FA verification page")
+            if not self._handle_2fa(submitted_at=submitted_at):
+                logger.error("2FA verification failed")
                 return False
 
-            # Check if we're on 2FA page
-            if "/security/2fa" in self.driver.current_url:
-                logger.info("Detected 2FA verification page")
-                if not self._handle_2fa():
-                    logger.error("2FA verification failed")
+        logger.success("Successfully logged in!")
+        return True
+
+    def _prefetch_month_csvs(self, month_name):
+        """Start (or reuse) the background download of *month_name*'s CSVs and return its future.
+        A finished download is reused across retries; a failed one is started again."""
+        future = self._csv_prefetch.get(month_name)
+        if future is None or (future.done() and not future.result()):
+            future = self._csv_prefetch[month_name] = self._io_pool.submit(self._download_month_csvs, month_name)
+        return future
+
+    def run_with_retries(self, max_retries=None, month_name=None):
+        """Call run(), retrying up to *max_retries* times (Config.MAX_RETRIES by default) only
+        when the browser stopped responding. A failure with a live browser is returned as is:
+        another attempt would pay for a new 2Captcha solve and 2FA email, and the workflows
+        already run their own debug retry."""
+        if max_retries is None:
+            max_retries = Config.MAX_RETRIES
+        managed, self._managed = self._managed, True
+        try:
+            for attempt in range(1, max_retries + 1):
+                if self.run(month_name):
+                    return True
+                if attempt == max_retries or self._keep_browser_awake():
                     return False
+                logger.warning(f"Browser not responding; relaunching for attempt {attempt + 1}/{max_retries}...")
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.setup_browser()
+            return False
+        finally:
+            self._managed = managed
+            if not managed:
+                logger.info("Closing browser...")
+                self.close()
+
+    def run(self, month_name=None):
+        """Execute the upload process.
+        *month_name* (e.g. 'November') lets a caller driving several runs resolve the month once
+        and pass it in; by default the current month is used."""
+        if month_name:
+            self._month_name = month_name
+        try:
+            # The CSV download only needs the month name; let it run while the browser signs in
+            self._prefetch_month_csvs(self._get_month_name())
 
-            logger.success("Successfully logged in!")
+            login_url = Config.LOGIN_URL
+            logger.info("Opening Mawaqit backoffice login page...")
+            self._restore_cookies(login_url)
+            self.driver.get(login_url)
+
+            # A still-valid session (same browser, persistent profile or restored cookies)
+            # is redirected straight off the login page; only sign in when the form is served
+            if "/login" not in (self.driver.current_url or ""):
+                logger.success("Reusing logged-in session; skipping login")
+            elif not self._login():
+                return False
+            else:
+                self._save_cookies()
 
             # Wait for navigation after login
             logger.info("Waiting for navigation after login...")
-            time.sleep(3)
+            self._wait_for_document_ready(timeout=10)
             
             current_url = self.driver.current_url
             logger.info(f"Current URL after login: {current_url}")
@@ -3211,7 +3741,7 @@ class MawaqitUploader:
                     return False
                 
                 # Wait for navigation after 2FA
-                time.sleep(3)
+                self._wait_for_document_ready(timeout=10)
                 current_url = self.driver.current_url
                 logger.info(f"Current URL after 2FA: {current_url}")
             
@@ -3225,39 +3755,27 @@ class MawaqitUploader:
                 # We're on the backoffice or main landing, need to navigate to mosque
                 logger.info("On landing page, looking for mosque/backoffice link...")
                 
-                # Try to find a mosque card, backoffice link, or admin link
-                mosque_selectors = [
-                    "//a[contains(@href, '/backoffice')]",
-                    "//a[contains(@href, '/mosque/')]",
-                    "//a[contains(., 'Backoffice') or contains(., 'Administration')]",
-                    "//a[contains(., 'Manage') or contains(., 'Configure') or contains(., 'Admin')]",
-                    "//div[contains(@class, 'card')]//a[contains(@class, 'btn')]",
-                    "//nav//a[contains(@href, 'backoffice')]"
-                ]
-                
+                # Try to find a mosque card, backoffice link, or admin link; the first visible
+                # match across all locators is resolved in a single script call
                 found_mosque = False
-                for selector in mosque_selectors:
+                link, selector = self._first_visible_by_xpath(self._MOSQUE_LINK_XPATHS, cache_key="mosque_link")
+                if link is not None:
+                    logger.info(f"Found link via {selector}")
                     try:
-                        links = self.driver.find_elements(By.XPATH, selector)
-                        for link in links:
-                            if link.is_displayed():
-                                href = link.get_attribute('href') or ''
-                                text = link.text or ''
-                                logger.info(f"Found link: '{text}' -> {href}")
-                                
-                                # Click the first visible mosque/admin link
-                                try:
-                                    link.click()
-                                    logger.success(f"Clicked link: {text}")
-                                    time.sleep(2)
-                                    found_mosque = True
-                                    break
-                                except Exception as e:
-                                    logger.debug(f"Click failed: {e}")
-                        if found_mosque:
-                            break
-                    except Exception:
-                        continue
+                        try:
+                            link.click()
+                        except Exception as e:
+                            logger.debug(f"Native click failed ({e}), using JS click")
+                            self.driver.execute_script("arguments[0].click();", link)
+                        logger.success("Clicked mosque/admin link")
+                        try:
+                            WebDriverWait(self.driver, 10).until(EC.staleness_of(link))
+                        except TimeoutException:
+                            pass
+                        self._wait_for_document_ready(timeout=10)
+                        found_mosque = True
+                    except Exception as e:
+                        logger.debug(f"Click failed: {e}")
                 
                 if not found_mosque:
                     logger.error("Could not find mosque/admin link on backoffice page")
@@ -3272,7 +3790,7 @@ class MawaqitUploader:
                 # Download and upload CSVs
                 month = self._get_month_name()
                 logger.info(f"Preparing CSVs for month: {month}")
-                csvs = self._download_month_csvs(month)
+                csvs = self._prefetch_month_csvs(month).result()
                 if csvs and 'athan' in csvs:
                     logger.info("Uploading athan CSV via Pre-populate UI...")
                     if self._click_calculation_and_prepopulate(csvs['athan'], month):
@@ -3315,11 +3833,10 @@ class MawaqitUploader:
             return False
 
         finally:
-            logger.info("Closing browser...")
-            try:
-                self.driver.quit()
-            except Exception:
-                pass
+            # Inside a ``with`` block the browser outlives run() so it can be reused
+            if not self._managed:
+                logger.info("Closing browser...")
+                self.close()
 
 
 if __name__ == "__main__":
@@ -3351,8 +3868,8 @@ if __name__ == "__main__":
     
     # Create uploader instance and run
     try:
-        uploader = MawaqitUploader()
-        success = uploader.run()
+        with MawaqitUploader() as uploader:
+            success = uploader.run_with_retries()
         
         if success:
             logger.success("🎉 Prayer times uploaded to Mawaqit successfully!")